@@ -1,149 +1,1030 @@
+import argparse
+import csv
 import cv2
 import numpy as np
 import configparser
 import os
-from datetime import datetime
-
-# **1. อ่านค่า Config จากไฟล์ Config_Video.ini**
-config = configparser.ConfigParser()
-config.read('Config_Video.ini')  # ใช้ไฟล์ Config_Video.ini
-
-# อ่านค่าของ HSV Custom Lower และ Upper จากไฟล์ .ini
-HSV_Custom_Lower = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Lower').split(',')])
-HSV_Custom_Upper = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Upper').split(',')])
-
-# อ่านค่า video_path และ undesired_colors_file_path จากไฟล์ .ini
-video_path = config.get('Paths', 'video_path')
-undesired_colors_file_path = '/Users/9phoomphi/Desktop/PJ_Code_edit/HSV_TEST/Out_Put/required_undesired_colors.txt'
-
-undesired_colors_hsv = []
-
-# **2. อ่านค่าสีที่ไม่ต้องการจากไฟล์ (required_undesired_colors.txt)**
-try:
-    with open(undesired_colors_file_path, 'r') as file:
-        line = file.readline()
-        if line.startswith("Undesired colors:"):
-            colors_string = line.split(": ")[1]
-            color_groups = colors_string.strip().split(";")
-            for color_group in color_groups:
-                color_str = color_group.strip("[]").split(",")
-                if len(color_str) == 3:
-                    h, s, v = map(int, color_str)
-                    undesired_colors_hsv.append(np.array([h, s, v]))
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from bgr_engine import class_mask, classify_bgr, load_bgr_table, range_table, verify_bgr_table
+from color_engine import FINAL_CLASS, compile_color_table, lookup, mask_table, new_occupancy, pack_hsv
+from color_store import existing_color_set_path, read_color_set
+from frame_profiler import NULL_PROFILER, FrameProfiler
+
+FRAME_SIZE = (640, 360)  # ขนาดเฟรมที่ใช้ประมวลผล (กว้าง, สูง)
+
+
+# ไฟล์สีที่ไม่ต้องการที่ใช้เมื่อไฟล์ Config ไม่ได้กำหนด undesired_colors_file_path
+UNDESIRED_COLORS_FILE_PATH = '/Users/9phoomphi/Desktop/PJ_Code_edit/HSV_TEST/Out_Put/required_undesired_colors.hsvset'
+
+
+def load_settings(config_path='Config_Video.ini'):
+    """
+    อ่านค่า Config และไฟล์สีที่ไม่ต้องการ แล้วคอมไพล์เป็นตาราง Lookup
+    Returns (video_path, HSV_Custom_Lower, HSV_Custom_Upper, final_table)
+    """
+    # **1. อ่านค่า Config จากไฟล์ Config_Video.ini**
+    config = configparser.ConfigParser()
+    config.read(config_path)  # ใช้ไฟล์ Config_Video.ini
+
+    # อ่านค่าของ HSV Custom Lower และ Upper จากไฟล์ .ini
+    HSV_Custom_Lower, HSV_Custom_Upper = read_hsv_range(config)
+
+    # อ่านค่า video_path และ undesired_colors_file_path จากไฟล์ .ini
+    video_path = config.get('Paths', 'video_path')
+    undesired_colors_file_path = read_undesired_path(config)
+    final_table = compile_final_table(HSV_Custom_Lower, HSV_Custom_Upper, undesired_colors_file_path)
+    return video_path, HSV_Custom_Lower, HSV_Custom_Upper, final_table
+
+
+def read_hsv_range(config):
+    """
+    Returns (HSV_Custom_Lower, HSV_Custom_Upper) จากส่วน [HSV_Values] ของ Config
+    """
+    HSV_Custom_Lower = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Lower').split(',')])
+    HSV_Custom_Upper = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Upper').split(',')])
+    return HSV_Custom_Lower, HSV_Custom_Upper
+
+
+def read_undesired_path(config):
+    """
+    Returns ไฟล์สีที่ไม่ต้องการจากส่วน [Paths] ของ Config (ใช้ UNDESIRED_COLORS_FILE_PATH ถ้าไม่ได้กำหนด)
+    """
+    return config.get('Paths', 'undesired_colors_file_path', fallback=UNDESIRED_COLORS_FILE_PATH)
+
+
+def compile_final_table(HSV_Custom_Lower, HSV_Custom_Upper, undesired_colors_file_path):
+    """
+    อ่านไฟล์สีที่ไม่ต้องการ แล้วคอมไพล์ช่วงสีที่ต้องการและสีที่ไม่ต้องการเป็นตาราง Final Mask
+    """
+    undesired_colors_hsv = new_occupancy()
+
+    # main.py เขียนไฟล์ข้อความแบบเดิมเฉพาะเมื่อใช้ --text-colors จึงใช้ไฟล์ .hsvset ชื่อเดียวกันแทนถ้าไม่มีไฟล์นั้น
+    undesired_colors_file_path = existing_color_set_path(undesired_colors_file_path)
+
+    # **2. อ่านค่าสีที่ไม่ต้องการจากไฟล์ (รองรับทั้งไฟล์ไบนารี .hsvset และไฟล์ข้อความแบบเดิม)**
+    try:
+        undesired_colors_hsv = read_color_set(undesired_colors_file_path)
+    except FileNotFoundError:
+        print(f"คำเตือน: ไม่พบไฟล์สีที่ไม่ต้องการ: {undesired_colors_file_path}")
+    except ValueError:
+        print(f"คำเตือน: รูปแบบไฟล์สีที่ไม่ต้องการอาจไม่ถูกต้อง: {undesired_colors_file_path}")
+    except Exception as e:
+        print(f"คำเตือน: ข้อผิดพลาดในการอ่านไฟล์สีที่ไม่ต้องการ: {e}")
+
+    if not undesired_colors_hsv.any():
+        print("ไม่มีสีที่ไม่ต้องการถูกโหลดจากไฟล์ หรือไฟล์ไม่มี")
+
+    # **2.1 คอมไพล์ช่วงสีที่ต้องการและสีที่ไม่ต้องการ (±5) เป็นตาราง Lookup ครั้งเดียว ใช้ซ้ำทุกเฟรม**
+    return mask_table(compile_color_table(HSV_Custom_Lower, HSV_Custom_Upper, undesired_colors_hsv), FINAL_CLASS)
+
+
+def load_profiles(config_paths):
+    """
+    อ่านไฟล์ Config หลายไฟล์ (หนึ่งไฟล์ต่อ Profile) สำหรับโหมด --profiles
+    แต่ละไฟล์กำหนด [HSV_Values] และอาจกำหนดไฟล์สีที่ไม่ต้องการของตัวเองใน [Paths] undesired_colors_file_path
+    Returns [(ชื่อ Profile, HSV_Custom_Lower, HSV_Custom_Upper, final_table), ...]
+    """
+    profiles = []
+    names = set()
+    for config_path in config_paths:
+        config = configparser.ConfigParser()
+        if not config.read(config_path):
+            raise FileNotFoundError(f"ไม่พบไฟล์ Config: {config_path}")
+        HSV_Custom_Lower, HSV_Custom_Upper = read_hsv_range(config)
+        undesired_colors_file_path = read_undesired_path(config)
+        final_table = compile_final_table(HSV_Custom_Lower, HSV_Custom_Upper, undesired_colors_file_path)
+
+        # ชื่อ Profile มาจากชื่อไฟล์ Config (เติมลำดับถ้าชื่อซ้ำ)
+        name = os.path.splitext(os.path.basename(config_path))[0]
+        if name in names:
+            name = f"{name}_{len(profiles)}"
+        names.add(name)
+        profiles.append((name, HSV_Custom_Lower, HSV_Custom_Upper, final_table))
+    return profiles
+
+
+class FrameProcessor:
+    """
+    ประมวลผลเฟรมด้วย Buffer ที่จองไว้ครั้งเดียวต่อความละเอียด (ไม่จองหน่วยความจำใหม่ทุกเฟรม)
+    ผลลัพธ์ของ OpenCV ถูกเขียนผ่าน dst= ลงใน Buffer และภาพรวม 2x2 ถูกเขียนลงใน Sub-view ของ Canvas ที่ใช้ซ้ำ
+    """
+
+    def __init__(self, HSV_Custom_Lower, HSV_Custom_Upper, final_table, frame_size=FRAME_SIZE):
+        self.HSV_Custom_Lower = HSV_Custom_Lower
+        self.HSV_Custom_Upper = HSV_Custom_Upper
+        self.final_table = final_table
+        self.frame_size = frame_size
+        width, height = frame_size
+
+        # Buffer สำหรับแต่ละขั้นตอน
+        self.frame_resized = np.empty((height, width, 3), dtype=np.uint8)
+        self.hsv_frame = np.empty((height, width, 3), dtype=np.uint8)
+        self.desired_color_mask = np.empty((height, width), dtype=np.uint8)
+        self.final_mask = np.empty((height, width), dtype=np.uint8)
+        self.keys = np.empty(height * width, dtype=np.uint32)
+        self.total_pixels = height * width
+
+        # **16. คำนวณสัดส่วนของรูปภาพ และ ขนาดตัวหนังสือ** (คงที่ต่อความละเอียด)
+        base_image_width = 900.0
+        image_scale_factor = width * 2 / base_image_width
+        base_font_scale = 0.5
+        self.font_scale = base_font_scale * image_scale_factor
+
+    def new_canvas(self):
+        """
+        สร้าง Canvas ภาพรวม 2x2 สำหรับใช้ซ้ำทุกเฟรม
+        """
+        width, height = self.frame_size
+        return np.zeros((height * 2, width * 2, 3), dtype=np.uint8)
+
+    def analyze(self, frame, frame_resized=None, profiler=NULL_PROFILER):
+        """
+        ย่อขนาดเฟรม (ลงใน frame_resized ถ้ากำหนด), สร้าง Mask และคำนวณค่าสถิติ
+        Returns (accuracy_percentage, tracking_efficiency)
+        """
+        if frame_resized is None:
+            frame_resized = self.frame_resized
+
+        # **8. ลดขนาดภาพเพื่อเพิ่มประสิทธิภาพ**
+        with profiler.stage('resize'):
+            cv2.resize(frame, self.frame_size, dst=frame_resized)  # ปรับขนาดภาพให้เล็กลง
+        self.compute_masks(frame_resized, profiler)
+
+        with profiler.stage('stats'):
+            correct_detected_pixels = cv2.countNonZero(self.final_mask)
+            desired_pixels = cv2.countNonZero(self.desired_color_mask)
+        return self.frame_stats(correct_detected_pixels, desired_pixels)
+
+    def compute_masks(self, frame_resized, profiler=NULL_PROFILER):
+        """
+        แปลงเป็น HSV และสร้าง Desired/Final Mask ของทั้งเฟรมลงใน Buffer
+        """
+        with profiler.stage('cvtColor'):
+            cv2.cvtColor(frame_resized, cv2.COLOR_BGR2HSV, dst=self.hsv_frame)
+
+        # **9. สร้าง Desired Color Mask**
+        with profiler.stage('desired_mask'):
+            cv2.inRange(self.hsv_frame, self.HSV_Custom_Lower, self.HSV_Custom_Upper, dst=self.desired_color_mask)
+
+        # **10-11. สร้าง Final Mask จากตาราง Lookup (Desired และไม่อยู่ใน Undesired ±5)**
+        with profiler.stage('final_mask'):
+            lookup(self.final_table, self.hsv_frame, out=self.final_mask, keys=self.keys)
+
+    def frame_stats(self, correct_detected_pixels, desired_pixels):
+        """
+        Returns (accuracy_percentage, tracking_efficiency) จากจำนวนพิกเซลของ Final และ Desired Mask
+        """
+        # **13. คำนวณความแม่นยำของสีที่ตรวจพบ**
+        accuracy_percentage = (correct_detected_pixels / self.total_pixels) * 100
+
+        # **14. คำนวณค่าการติดตามสี (Tracking Efficiency)**
+        tracking_efficiency = (desired_pixels / self.total_pixels) * 100
+        return accuracy_percentage, tracking_efficiency
+
+    def compose(self, canvas, accuracy_percentage, tracking_efficiency, profiler=NULL_PROFILER):
+        """
+        เติม Canvas ที่ครึ่งบนซ้ายมีภาพที่ย่อขนาดแล้ว (จาก analyze) ให้เป็นภาพรวม 2x2 พร้อมตัวหนังสือ
+        """
+        width, height = self.frame_size
+
+        # **12. นำ Final Mask ไปใช้กับภาพต้นฉบับ** และ **15. รวมภาพ** ลงใน Sub-view ของ Canvas โดยตรง
+        with profiler.stage('compose'):
+            frame_resized = canvas[0:height, 0:width]  # แสดงภาพต้นฉบับ
+            masked_output = canvas[0:height, width:width * 2]  # แสดงผลลัพธ์ที่ประมวลผล
+            masked_output.fill(0)
+            cv2.bitwise_and(frame_resized, frame_resized, dst=masked_output, mask=self.final_mask)
+            canvas[height:].fill(0)
+
+        # **17. แสดงผลลัพธ์ (ภาพรวมในหน้าต่างเดียว) พร้อมตัวหนังสือปรับขนาด**
+        with profiler.stage('putText'):
+            cv2.putText(canvas, f'Accuracy: {accuracy_percentage:.2f}%', (10, height + 20), cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+            cv2.putText(canvas, f'Tracking Efficiency: {tracking_efficiency:.2f}%', (width + 10, height + 20), cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+        return canvas
+
+    def process(self, frame, canvas, profiler=NULL_PROFILER):
+        """
+        ประมวลผลหนึ่งเฟรมและเขียนภาพรวม 2x2 ลงใน canvas
+        Returns (accuracy_percentage, tracking_efficiency)
+        """
+        width, height = self.frame_size
+        frame_stats = self.analyze(frame, canvas[0:height, 0:width], profiler)
+        self.compose(canvas, *frame_stats, profiler=profiler)
+        return frame_stats
+
+
+class IncrementalFrameProcessor(FrameProcessor):
+    """
+    FrameProcessor สำหรับวิดีโอที่ภาพส่วนใหญ่นิ่ง: แบ่งเฟรมเป็น Tile และคำนวณ HSV/Mask ใหม่เฉพาะ Tile ที่เปลี่ยน
+    Tile ถือว่าเปลี่ยนเมื่อค่าต่างสูงสุดเทียบกับภาพที่ใช้คำนวณครั้งล่าสุดเกิน threshold
+    (threshold = 0 ให้ผลตรงกับการคำนวณทั้งเฟรมทุกประการ) และคำนวณทั้งเฟรมใหม่ทุก refresh_every เฟรม
+    """
+
+    # ถ้า Tile เปลี่ยนเกินสัดส่วนนี้ คำนวณทั้งเฟรมแบบ Vectorized จะเร็วกว่า
+    FULL_RECOMPUTE_FRACTION = 0.5
+
+    def __init__(self, HSV_Custom_Lower, HSV_Custom_Upper, final_table, frame_size=FRAME_SIZE,
+                 tile_size=40, threshold=0, refresh_every=0):
+        super().__init__(HSV_Custom_Lower, HSV_Custom_Upper, final_table, frame_size)
+        width, height = frame_size
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.refresh_every = refresh_every
+        self.row_starts = np.arange(0, height, tile_size)
+        self.col_starts = np.arange(0, width, tile_size)
+        tiles_shape = (self.row_starts.size, self.col_starts.size)
+
+        self.reference = np.empty((height, width, 3), dtype=np.uint8)  # ภาพที่ใช้คำนวณแต่ละ Tile ครั้งล่าสุด
+        self.diff = np.empty((height, width, 3), dtype=np.uint8)
+        self.desired_counts = np.zeros(tiles_shape, dtype=np.int64)
+        self.final_counts = np.zeros(tiles_shape, dtype=np.int64)
+        self.frames_since_refresh = None  # None = ยังไม่เคยคำนวณทั้งเฟรม
+        self.tiles_recomputed = 0
+        self.tiles_seen = 0
+
+    def _tile_sums(self, image, channels=1):
+        # ผลรวมค่าพิกเซลของแต่ละ Tile จาก Integral Image (รองรับ Tile ขอบที่เล็กกว่า tile_size)
+        height, width = image.shape[:2]
+        integral = cv2.integral(image.reshape(height, width * channels))
+        rows = np.append(self.row_starts, height)
+        cols = np.append(self.col_starts, width) * channels
+        corners = integral[np.ix_(rows, cols)].astype(np.int64)
+        return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+
+    def changed_tiles(self, frame_resized):
+        """
+        Returns bool array (แถว Tile, คอลัมน์ Tile) ของ Tile ที่ต้องคำนวณใหม่
+        """
+        cv2.absdiff(frame_resized, self.reference, dst=self.diff)
+        cv2.threshold(self.diff, self.threshold, 1, cv2.THRESH_BINARY, dst=self.diff)
+        return self._tile_sums(self.diff, channels=3) > 0
+
+    def analyze(self, frame, frame_resized=None, profiler=NULL_PROFILER):
+        if frame_resized is None:
+            frame_resized = self.frame_resized
+
+        # **8. ลดขนาดภาพเพื่อเพิ่มประสิทธิภาพ**
+        with profiler.stage('resize'):
+            cv2.resize(frame, self.frame_size, dst=frame_resized)  # ปรับขนาดภาพให้เล็กลง
+
+        refresh = self.frames_since_refresh is None or (
+            self.refresh_every > 0 and self.frames_since_refresh + 1 >= self.refresh_every)
+        changed = None
+        if not refresh:
+            with profiler.stage('tile_diff'):
+                changed = self.changed_tiles(frame_resized)
+        self.tiles_seen += self.desired_counts.size
+
+        if changed is None or changed.mean() > self.FULL_RECOMPUTE_FRACTION:
+            # คำนวณทั้งเฟรม แล้วนับพิกเซลใหม่ทุก Tile
+            self.compute_masks(frame_resized, profiler)
+            with profiler.stage('stats'):
+                self.desired_counts[:] = self._tile_sums(self.desired_color_mask) // 255
+                self.final_counts[:] = self._tile_sums(self.final_mask) // 255
+            np.copyto(self.reference, frame_resized)
+            self.tiles_recomputed += self.desired_counts.size
         else:
-            print(f"คำเตือน: รูปแบบไฟล์สีที่ไม่ต้องการอาจไม่ถูกต้อง: {undesired_colors_file_path}")
-except FileNotFoundError:
-    print(f"คำเตือน: ไม่พบไฟล์สีที่ไม่ต้องการ: {undesired_colors_file_path}")
-except Exception as e:
-    print(f"คำเตือน: ข้อผิดพลาดในการอ่านไฟล์สีที่ไม่ต้องการ: {e}")
-
-if not undesired_colors_hsv:
-    print("ไม่มีสีที่ไม่ต้องการถูกโหลดจากไฟล์ หรือไฟล์ไม่มี")
-
-# **3. อ่านไฟล์ .webm หรือ .mp4**
-cap = cv2.VideoCapture(video_path)
-
-# ตรวจสอบว่าเปิดไฟล์วิดีโอได้หรือไม่
-if not cap.isOpened():
-    print(f"ไม่สามารถเปิดไฟล์วิดีโอได้ที่ {video_path}")
-    exit()
-
-# **4. เตรียมโฟลเดอร์ Output**
-output_folder = 'Out_Put'
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
-
-# **5. กำหนด codec และ VideoWriter สำหรับการบันทึกวิดีโอ**
-fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # เลือก codec สำหรับ .mp4 (สามารถเปลี่ยนเป็น 'webm' หรืออื่นๆ ได้)
-output_video_path = os.path.join(output_folder, 'processed_video.mp4')
-out = cv2.VideoWriter(output_video_path, fourcc, cap.get(cv2.CAP_PROP_FPS), 
-                      (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))))
-
-if not out.isOpened():
-    print("ไม่สามารถสร้าง VideoWriter ได้")
-    exit()
-
-# **6. เพิ่มการควบคุม FPS**
-fps = cap.get(cv2.CAP_PROP_FPS)  # ใช้ FPS จากไฟล์วิดีโอ
-delay = int(1000 / fps)  # คำนวณเวลา delay สำหรับแต่ละเฟรม
-
-# **7. อ่านแต่ละเฟรมจากวิดีโอและประมวลผล**
-while True:
-    ret, frame = cap.read()
-    
-    if not ret:
-        print("ไม่สามารถอ่านเฟรมจากวิดีโอได้หรือถึงจุดสิ้นสุดของวิดีโอ")
-        break  # ถ้าไม่มีเฟรมให้เล่นแล้ว
-    
-    # **8. ลดขนาดภาพเพื่อเพิ่มประสิทธิภาพ**
-    frame_resized = cv2.resize(frame, (640, 360))  # ปรับขนาดภาพให้เล็กลง
-    hsv_frame = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2HSV)
-
-    # **9. สร้าง Desired Color Mask**
-    desired_color_mask = cv2.inRange(hsv_frame, HSV_Custom_Lower, HSV_Custom_Upper)
-
-    # **10. สร้าง Undesired Color Mask Total**
-    undesired_mask_total = np.zeros_like(desired_color_mask)
-    for color in undesired_colors_hsv:
-        lower_bound = np.array([max(0, color[0]-5), max(0, color[1]-5), max(0, color[2]-5)])
-        upper_bound = np.array([min(179, color[0]+5), min(255, color[1]+5), min(255, color[2]+5)])
-        undesired_color_mask = cv2.inRange(hsv_frame, lower_bound, upper_bound)
-        undesired_mask_total = cv2.bitwise_or(undesired_mask_total, undesired_color_mask)
-
-    # **11. สร้าง Final Mask**
-    final_mask = cv2.bitwise_and(desired_color_mask, cv2.bitwise_not(undesired_mask_total))
-
-    # **12. นำ Final Mask ไปใช้กับภาพต้นฉบับ**
-    # ตรวจสอบให้แน่ใจว่า final_mask มีขนาดเท่ากับ frame
-    if final_mask.shape[:2] != frame_resized.shape[:2]:
-        final_mask_resized = cv2.resize(final_mask, (frame_resized.shape[1], frame_resized.shape[0]))
-    else:
-        final_mask_resized = final_mask
+            with profiler.stage('tile_masks'):
+                size = self.tile_size
+                for row, col in np.argwhere(changed):
+                    y, x = row * size, col * size
+                    tile = (slice(y, y + size), slice(x, x + size))
+                    hsv_tile = self.hsv_frame[tile]
+                    cv2.cvtColor(frame_resized[tile], cv2.COLOR_BGR2HSV, dst=hsv_tile)
+                    desired_tile = self.desired_color_mask[tile]
+                    cv2.inRange(hsv_tile, self.HSV_Custom_Lower, self.HSV_Custom_Upper, dst=desired_tile)
+                    final_tile = lookup(self.final_table, hsv_tile)
+                    self.final_mask[tile] = final_tile
+                    self.desired_counts[row, col] = cv2.countNonZero(desired_tile)
+                    self.final_counts[row, col] = cv2.countNonZero(final_tile)
+                    self.reference[tile] = frame_resized[tile]
+            self.tiles_recomputed += int(changed.sum())
+
+        self.frames_since_refresh = 0 if refresh else self.frames_since_refresh + 1
+        return self.frame_stats(int(self.final_counts.sum()), int(self.desired_counts.sum()))
+
+
+class BgrFrameProcessor(FrameProcessor):
+    """
+    FrameProcessor ที่ไม่แปลงเฟรมเป็น HSV: อ่าน Class ของแต่ละพิกเซลจากตาราง BGR 16.7M ค่า (bgr_engine)
+    ครั้งเดียว แล้วแยกเป็น Desired Mask (bit 0) และ Final Mask (bit 1) ได้ผลตรงกับ FrameProcessor ทุกพิกเซล
+    """
+
+    def __init__(self, HSV_Custom_Lower, HSV_Custom_Upper, final_table, bgr_table, frame_size=FRAME_SIZE):
+        super().__init__(HSV_Custom_Lower, HSV_Custom_Upper, final_table, frame_size)
+        self.bgr_table = bgr_table
+        self.classes = np.empty((frame_size[1], frame_size[0]), dtype=np.uint8)
+
+    def compute_masks(self, frame_resized, profiler=NULL_PROFILER):
+        # **9-11. Desired และ Final Mask จากการเปิดตารางครั้งเดียวต่อพิกเซล**
+        with profiler.stage('classify'):
+            classify_bgr(self.bgr_table, frame_resized, out=self.classes, keys=self.keys)
+        with profiler.stage('class_masks'):
+            class_mask(self.classes, 0, out=self.desired_color_mask)
+            class_mask(self.classes, 1, out=self.final_mask)
+
+
+def bgr_tables(HSV_Custom_Lower, HSV_Custom_Upper, final_table):
+    """
+    ตาราง HSV ที่ BgrFrameProcessor รวมเป็นตาราง BGR (bit 0 = Desired, bit 1 = Final)
+    """
+    return [range_table(HSV_Custom_Lower, HSV_Custom_Upper), final_table]
+
+
+class MultiProfileProcessor:
+    """
+    ประมวลผลหลาย Profile บนเฟรมเดียวกัน: ย่อขนาด แปลงเป็น HSV และ Pack คีย์สีเพียงครั้งเดียวต่อเฟรม
+    แล้วให้แต่ละ Profile สร้าง Desired/Final Mask ของตัวเองจาก HSV และคีย์สีที่ใช้ร่วมกัน
+    analyze/process คืนค่าสถิติเป็นรายการ หนึ่งค่าต่อ Profile ตามลำดับของ profiles
+    """
+
+    def __init__(self, profiles, frame_size=FRAME_SIZE):
+        self.names = [name for name, _, _, _ in profiles]
+        self.processors = [FrameProcessor(HSV_Custom_Lower, HSV_Custom_Upper, final_table, frame_size)
+                           for _, HSV_Custom_Lower, HSV_Custom_Upper, final_table in profiles]
+        self.frame_size = frame_size
+
+        # Buffer ของเฟรม, HSV และคีย์สีที่ใช้ร่วมกันทุก Profile
+        shared = self.processors[0]
+        self.frame_resized = shared.frame_resized
+        self.hsv_frame = shared.hsv_frame
+        self.keys = shared.keys
+
+    def new_canvas(self):
+        """
+        สร้าง Canvas ภาพรวม 2x2 หนึ่งภาพต่อ Profile
+        """
+        return [processor.new_canvas() for processor in self.processors]
+
+    def analyze(self, frame, frame_resized=None, profiler=NULL_PROFILER):
+        if frame_resized is None:
+            frame_resized = self.frame_resized
+
+        # **8. ลดขนาดภาพ** และแปลงเป็น HSV ครั้งเดียวสำหรับทุก Profile
+        with profiler.stage('resize'):
+            cv2.resize(frame, self.frame_size, dst=frame_resized)
+        with profiler.stage('cvtColor'):
+            cv2.cvtColor(frame_resized, cv2.COLOR_BGR2HSV, dst=self.hsv_frame)
+            pack_hsv(self.hsv_frame, out=self.keys)
+
+        frame_stats = []
+        for processor in self.processors:
+            # **9-11. Desired และ Final Mask ของแต่ละ Profile**
+            with profiler.stage('desired_mask'):
+                cv2.inRange(self.hsv_frame, processor.HSV_Custom_Lower, processor.HSV_Custom_Upper,
+                            dst=processor.desired_color_mask)
+            with profiler.stage('final_mask'):
+                np.take(processor.final_table, self.keys, out=processor.final_mask.reshape(-1))
+            with profiler.stage('stats'):
+                correct_detected_pixels = cv2.countNonZero(processor.final_mask)
+                desired_pixels = cv2.countNonZero(processor.desired_color_mask)
+            frame_stats.append(processor.frame_stats(correct_detected_pixels, desired_pixels))
+        return frame_stats
+
+    def process(self, frame, canvases, profiler=NULL_PROFILER):
+        """
+        ประมวลผลหนึ่งเฟรมและเขียนภาพรวม 2x2 ของแต่ละ Profile ลงใน canvases (จาก new_canvas)
+        """
+        width, height = self.frame_size
+        frame_resized = canvases[0][0:height, 0:width]
+        frame_stats = self.analyze(frame, frame_resized, profiler)
+        for canvas, processor, stats in zip(canvases, self.processors, frame_stats):
+            if canvas is not canvases[0]:
+                canvas[0:height, 0:width] = frame_resized
+            processor.compose(canvas, *stats, profiler=profiler)
+        return frame_stats
+
+
+class ProfileWriters:
+    """
+    VideoWriter หนึ่งตัวต่อ Profile ใช้แทน VideoWriter ตัวเดียวใน run_headless เมื่อ Canvas เป็นรายการต่อ Profile
+    """
+
+    def __init__(self, writers):
+        self.writers = writers
+
+    def write(self, canvases):
+        for writer, canvas in zip(self.writers, canvases):
+            writer.write(canvas)
+
+    def release(self):
+        for writer in self.writers:
+            writer.release()
+
+
+def profile_path(path, name):
+    """
+    ชื่อไฟล์ผลลัพธ์ของหนึ่ง Profile: เติม .<name> ก่อนนามสกุล (เช่น stats.csv -> stats.<name>.csv)
+    """
+    base, ext = os.path.splitext(path)
+    return f"{base}.{name}{ext}"
 
-    masked_output = cv2.bitwise_and(frame_resized, frame_resized, mask=final_mask_resized)
 
-    # **13. คำนวณความแม่นยำของสีที่ตรวจพบ**
-    total_pixels = frame_resized.size // 3
-    correct_detected_pixels = cv2.countNonZero(final_mask_resized)
-    accuracy_percentage = (correct_detected_pixels / total_pixels) * 100
+def open_writer(output_video_path, fps, frame_size):
+    """
+    สร้าง VideoWriter (mp4v) สำหรับไฟล์ผลลัพธ์ คืนค่า None ถ้าสร้างไม่สำเร็จ
+    """
+    # **4. เตรียมโฟลเดอร์ Output**
+    output_folder = os.path.dirname(output_video_path)
+    if output_folder and not os.path.exists(output_folder):
+        os.makedirs(output_folder)
 
-    # **14. คำนวณค่าการติดตามสี (Tracking Efficiency)**
-    tracking_efficiency = (cv2.countNonZero(desired_color_mask) / total_pixels) * 100
+    # **5. กำหนด codec และ VideoWriter สำหรับการบันทึกวิดีโอ**
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # เลือก codec สำหรับ .mp4 (สามารถเปลี่ยนเป็น 'webm' หรืออื่นๆ ได้)
+    out = cv2.VideoWriter(output_video_path, fourcc, fps, frame_size)
+    if not out.isOpened():
+        print("ไม่สามารถสร้าง VideoWriter ได้")
+        return None
+    return out
 
-    # **15. รวมภาพต้นฉบับและผลลัพธ์ที่ประมวลผล**
-    mask_height, mask_width = final_mask_resized.shape[:2]
-    combined_image_width = mask_width * 2
-    combined_image_height = mask_height * 2
 
-    combined_image = np.zeros((combined_image_height, combined_image_width, 3), dtype=np.uint8)
+def video_properties(cap):
+    """
+    Returns (fps, (width, height), frame_count) ของวิดีโอต้นฉบับ
+    """
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    return cap.get(cv2.CAP_PROP_FPS), frame_size, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    # รวมภาพต้นฉบับและภาพที่ประมวลผล
-    combined_image[0:mask_height, 0:mask_width] = frame_resized  # แสดงภาพต้นฉบับ
-    combined_image[0:mask_height, mask_width:combined_image_width] = masked_output  # แสดงผลลัพธ์ที่ประมวลผล
 
-    # **16. คำนวณสัดส่วนของรูปภาพ และ ขนาดตัวหนังสือ**
-    base_image_width = 900.0
-    image_scale_factor = combined_image_width / base_image_width
-    base_font_scale = 0.5
-    font_scale = base_font_scale * image_scale_factor
+def open_video(video_path, output_video_path):
+    """
+    เปิดไฟล์วิดีโอต้นฉบับและสร้าง VideoWriter สำหรับไฟล์ผลลัพธ์
+    Returns (cap, out) หรือ (None, None) ถ้าเปิดไม่สำเร็จ
+    """
+    # **3. อ่านไฟล์ .webm หรือ .mp4**
+    cap = cv2.VideoCapture(video_path)
+
+    # ตรวจสอบว่าเปิดไฟล์วิดีโอได้หรือไม่
+    if not cap.isOpened():
+        print(f"ไม่สามารถเปิดไฟล์วิดีโอได้ที่ {video_path}")
+        return None, None
+
+    fps, frame_size, _ = video_properties(cap)
+    out = open_writer(output_video_path, fps, frame_size)
+    if out is None:
+        cap.release()
+        return None, None
+    return cap, out
+
+
+def run_interactive(cap, out, processor, profiler=NULL_PROFILER):
+    """
+    เล่นวิดีโอพร้อมแสดงผลในหน้าต่าง ตามความเร็วจริงของวิดีโอ
+    Returns ค่าสถิติรายเฟรม [(accuracy_percentage, tracking_efficiency), ...]
+    """
+    frame_stats = []
+    combined_image = processor.new_canvas()
+
+    # **6. เพิ่มการควบคุม FPS**
+    fps = cap.get(cv2.CAP_PROP_FPS)  # ใช้ FPS จากไฟล์วิดีโอ
+    delay = int(1000 / fps)  # คำนวณเวลา delay สำหรับแต่ละเฟรม
+
+    # **7. อ่านแต่ละเฟรมจากวิดีโอและประมวลผล**
+    while True:
+        with profiler.stage('read'):
+            ret, frame = cap.read()
+
+        if not ret:
+            print("ไม่สามารถอ่านเฟรมจากวิดีโอได้หรือถึงจุดสิ้นสุดของวิดีโอ")
+            break  # ถ้าไม่มีเฟรมให้เล่นแล้ว
+
+        frame_stats.append(processor.process(frame, combined_image, profiler))
+
+        # บันทึกผลลัพธ์ลงในไฟล์
+        with profiler.stage('write'):
+            out.write(combined_image)
+
+        # **18. แสดงผล**
+        cv2.imshow('Original vs Processed', combined_image)
+
+        # รอการกดปุ่ม 'q' เพื่อออกจากการแสดงผล
+        if cv2.waitKey(delay) & 0xFF == ord('q'):
+            break
+
+    cv2.destroyAllWindows()
+    return frame_stats
+
+
+class _Stage:
+    """
+    สถิติของหนึ่งขั้นตอนใน Pipeline: จำนวนเฟรมและเวลาที่ใช้ทำงานจริง (ไม่นับเวลารอคิว)
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.busy_seconds = 0.0
+
+    def fps(self):
+        return self.frames / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+
+_END = object()  # สัญญาณจบสตรีมในคิว
+
+
+def run_headless(cap, out, processor, queue_size=8, profiler=NULL_PROFILER):
+    """
+    ประมวลผลแบบ Batch ไม่มีหน้าต่างและไม่หน่วงเวลา
+    แยก decode / mask / encode เป็น Thread ละขั้นตอน เชื่อมกันด้วยคิวที่จำกัดขนาด
+    Returns (สถิติของแต่ละขั้นตอน, ค่าสถิติรายเฟรม)
+    """
+    frame_stats = []
+    decoded = queue.Queue(maxsize=queue_size)
+    composed = queue.Queue(maxsize=queue_size)
+
+    # Canvas ที่ใช้หมุนเวียนระหว่างขั้นตอน mask และ encode (ไม่จองใหม่ทุกเฟรม)
+    free_canvases = queue.Queue()
+    for _ in range(queue_size + 2):
+        free_canvases.put(processor.new_canvas())
+    stages = [_Stage('decode'), _Stage('mask'), _Stage('encode')]
+    errors = []
+    stop = threading.Event()
+
+    def put(q, item):
+        # วนรอจนกว่าจะใส่ลงคิวได้ หรือมีขั้นตอนอื่นล้มเหลว
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def take(q):
+        # วนรอเฟรมถัดไป คืนค่า _END ถ้ามีขั้นตอนอื่นล้มเหลว
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _END
+
+    def decode_stage(stage):
+        while True:
+            start = time.perf_counter()
+            with profiler.stage('read'):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            stage.busy_seconds += time.perf_counter() - start
+            stage.frames += 1
+            if not put(decoded, frame):
+                return
+        put(decoded, _END)
+
+    def mask_stage(stage):
+        while True:
+            frame = take(decoded)
+            if frame is _END:
+                break
+            combined_image = take(free_canvases)
+            if combined_image is _END:
+                return
+            start = time.perf_counter()
+            frame_stats.append(processor.process(frame, combined_image, profiler))
+            stage.busy_seconds += time.perf_counter() - start
+            stage.frames += 1
+            if not put(composed, combined_image):
+                return
+        put(composed, _END)
+
+    def encode_stage(stage):
+        while True:
+            combined_image = take(composed)
+            if combined_image is _END:
+                break
+            start = time.perf_counter()
+            with profiler.stage('write'):
+                out.write(combined_image)
+            stage.busy_seconds += time.perf_counter() - start
+            stage.frames += 1
+            free_canvases.put(combined_image)
+
+    def guarded(target, stage):
+        try:
+            target(stage)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=guarded, args=(target, stage), name=stage.name)
+               for target, stage in zip((decode_stage, mask_stage, encode_stage), stages)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return stages, frame_stats
+
+
+def _process_segment(video_path, segment_path, start_frame, frame_count, processor):
+    """
+    Worker process: seek to start_frame, process frame_count frames (None = until the end of
+    the video) and encode them into segment_path. Returns the per-frame statistics.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"cannot open video {video_path}")
+    fps, frame_size, _ = video_properties(cap)
+    out = open_writer(segment_path, fps, frame_size)
+    if out is None:
+        cap.release()
+        raise IOError(f"cannot create segment {segment_path}")
+
+    frame_stats = []
+    combined_image = processor.new_canvas()
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        while frame_count is None or len(frame_stats) < frame_count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_stats.append(processor.process(frame, combined_image))
+            out.write(combined_image)
+    finally:
+        cap.release()
+        out.release()
+    return frame_stats
+
+
+def concat_segments(segment_paths, output_video_path, fps, frame_size):
+    """
+    ต่อไฟล์ Segment ตามลำดับเป็นไฟล์ผลลัพธ์เดียว
+    ใช้ ffmpeg (concat demuxer, ไม่ encode ซ้ำ) ถ้ามีในเครื่อง ไม่เช่นนั้นอ่านและเขียนใหม่ด้วย OpenCV
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg:
+        list_path = output_video_path + '.segments.txt'
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for path in segment_paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_path,
+                            '-c', 'copy', output_video_path], check=True)
+        finally:
+            os.remove(list_path)
+        return
+
+    out = open_writer(output_video_path, fps, frame_size)
+    if out is None:
+        raise IOError(f"cannot create {output_video_path}")
+    try:
+        for path in segment_paths:
+            segment = cv2.VideoCapture(path)
+            while True:
+                ret, frame = segment.read()
+                if not ret:
+                    break
+                out.write(frame)
+            segment.release()
+    finally:
+        out.release()
+
+
+def run_segments(video_path, output_video_path, segments, processor):
+    """
+    แบ่งวิดีโอเป็นช่วงเวลา N ช่วงตามเลขเฟรม ให้แต่ละ Process ประมวลผลหนึ่งช่วง
+    แล้วต่อไฟล์ผลลัพธ์และสถิติรายเฟรมตามลำดับ
+    Returns ค่าสถิติรายเฟรมของทั้งวิดีโอ
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"ไม่สามารถเปิดไฟล์วิดีโอได้ที่ {video_path}")
+        return None
+    fps, frame_size, total_frames = video_properties(cap)
+    cap.release()
+
+    # ช่วงสุดท้ายอ่านจนจบไฟล์ เผื่อ CAP_PROP_FRAME_COUNT ไม่ตรงกับจำนวนเฟรมจริง
+    segments = max(1, min(segments, total_frames))
+    bounds = [total_frames * i // segments for i in range(segments + 1)]
+    counts = [bounds[i + 1] - bounds[i] for i in range(segments - 1)] + [None]
+
+    base, ext = os.path.splitext(output_video_path)
+    segment_paths = [f"{base}.part{i:03d}{ext}" for i in range(segments)]
+    worker = partial(_process_segment, video_path, processor=processor)
+
+    try:
+        with ProcessPoolExecutor(max_workers=segments) as pool:
+            futures = [pool.submit(worker, path, start, count)
+                       for path, start, count in zip(segment_paths, bounds, counts)]
+            frame_stats = []
+            for future in futures:
+                frame_stats.extend(future.result())
+        concat_segments(segment_paths, output_video_path, fps, frame_size)
+    finally:
+        for path in segment_paths:
+            if os.path.exists(path):
+                os.remove(path)
+    return frame_stats
+
+
+def run_stats_only(cap, processor, stride=1, start_frame=0, end_frame=None, profiler=NULL_PROFILER):
+    """
+    คำนวณเฉพาะค่าสถิติรายเฟรม ไม่สร้างภาพ 2x2 และไม่ encode วิดีโอ
+    วิเคราะห์ทุก stride เฟรม ตั้งแต่ start_frame ถึงก่อน end_frame (None = จนจบไฟล์)
+    เฟรมที่ข้ามอ่านด้วย cap.grab() ซึ่งไม่ retrieve และไม่แปลงสีภาพ
+    Returns (frame_indices, frame_stats)
+    """
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)  # กระโดดไปยังช่วงเวลาที่ต้องการโดยตรง
+
+    frame_indices = []
+    frame_stats = []
+    index = start_frame
+    while end_frame is None or index < end_frame:
+        with profiler.stage('decode'):
+            ret, frame = cap.read()
+        if not ret:
+            break
+        frame_stats.append(processor.analyze(frame, profiler=profiler))
+        frame_indices.append(index)
+
+        # ข้ามเฟรมที่ไม่ได้วิเคราะห์
+        with profiler.stage('grab'):
+            skip = stride - 1 if end_frame is None else min(stride - 1, end_frame - index - 1)
+            for _ in range(skip):
+                if not cap.grab():
+                    return frame_indices, frame_stats
+        index += stride
+    return frame_indices, frame_stats
+
+
+def write_frame_stats(stats_path, frame_stats, frame_indices=None):
+    """
+    บันทึกค่าสถิติรายเฟรม (frame, accuracy, tracking_efficiency) เป็นไฟล์ CSV
+    หรือเป็นไฟล์ไบนารีแบบคอลัมน์ (.npz ของ numpy) ถ้านามสกุลเป็น .npz
+    frame_indices คือเลขเฟรมของแต่ละแถว (None = 0, 1, 2, ...)
+    """
+    if frame_indices is None:
+        frame_indices = range(len(frame_stats))
+
+    if stats_path.endswith('.npz'):
+        columns = np.array(frame_stats, dtype=np.float64).reshape(-1, 2)
+        np.savez(stats_path, frame=np.array(frame_indices, dtype=np.int64), accuracy=columns[:, 0],
+                 tracking_efficiency=columns[:, 1])
+        return
+
+    with open(stats_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frame', 'accuracy', 'tracking_efficiency'])
+        for index, (accuracy_percentage, tracking_efficiency) in zip(frame_indices, frame_stats):
+            writer.writerow([index, f'{accuracy_percentage:.6f}', f'{tracking_efficiency:.6f}'])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Apply the HSV color masks to every frame of a video.")
+    parser.add_argument('--config', default='Config_Video.ini', help="path of the video config file")
+    parser.add_argument('--output', default=os.path.join('Out_Put', 'processed_video.mp4'),
+                        help="path of the processed output video")
+    parser.add_argument('--headless', action='store_true',
+                        help="batch mode: no display and no pacing delay, decode/mask/encode run as pipelined threads")
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help="maximum number of frames buffered between pipeline stages in --headless mode")
+    parser.add_argument('--segments', type=int, default=0,
+                        help="split the video into N time segments processed by N worker processes (implies no display)")
+    parser.add_argument('--stats', help="write the per-frame accuracy/tracking statistics to this CSV file "
+                                        "(or a columnar numpy file if the name ends in .npz)")
+    parser.add_argument('--stats-only', action='store_true',
+                        help="only compute the statistics written to --stats: no display, no composed frames "
+                             "and no output video")
+    parser.add_argument('--stride', type=int, default=1,
+                        help="--stats-only analyzes every K-th frame and skips the others without retrieving them "
+                             "(default: 1)")
+    parser.add_argument('--start', type=float, default=0.0, help="--stats-only starts at this time in seconds")
+    parser.add_argument('--end', type=float, help="--stats-only stops at this time in seconds (default: end of video)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="recompute HSV and masks only for tiles that changed since the previous frame")
+    parser.add_argument('--tile-size', type=int, default=40, help="tile edge in pixels for --incremental (default: 40)")
+    parser.add_argument('--tile-threshold', type=int, default=0,
+                        help="per-pixel difference a tile must exceed to be recomputed; 0 keeps the output exact "
+                             "(default: 0)")
+    parser.add_argument('--refresh-every', type=int, default=0,
+                        help="force a full-frame recompute every N frames in --incremental mode (default: 0, never)")
+    parser.add_argument('--bgr-table', action='store_true',
+                        help="classify the raw BGR frames with a precomputed 16.7M-entry table instead of "
+                             "converting them to HSV (built once per configuration and cached on disk)")
+    parser.add_argument('--verify-bgr-table', action='store_true',
+                        help="with --bgr-table, check the table against the HSV pipeline for every BGR color first")
+    parser.add_argument('--profiles', nargs='+', metavar='CONFIG',
+                        help="evaluate several HSV profiles (config files with [HSV_Values] and an optional "
+                             "[Paths] undesired_colors_file_path) on the --config video in one decode pass; "
+                             "writes per-profile statistics and, unless --stats-only, one output video per "
+                             "profile named after --output (runs headless)")
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help="time every frame stage and write PREFIX.summary.json and a PREFIX.trace.json "
+                             "Chrome-trace/Perfetto timeline (not available with --segments)")
+    args = parser.parse_args(argv)
+    if args.stats_only and not args.stats:
+        parser.error("--stats-only needs a --stats output file")
+    if args.stride < 1:
+        parser.error("--stride must be at least 1")
+    if not args.stats_only and (args.stride != 1 or args.start != 0.0 or args.end is not None):
+        parser.error("--stride, --start and --end only apply to --stats-only")
+    if args.stats_only and (args.segments > 0 or args.headless):
+        parser.error("--stats-only cannot be combined with --segments or --headless")
+    if args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+    # --profiles ไม่แสดงผลจึงใช้ Pipeline แบบ --headless เสมอ
+    if args.queue_size != parser.get_default('queue_size') and (not (args.headless or args.profiles)
+                                                                or args.stats_only or args.segments > 0):
+        parser.error("--queue-size only applies to --headless (or --profiles) runs that write a video")
+    if not args.incremental and any(getattr(args, name) != parser.get_default(name)
+                                    for name in ('tile_size', 'tile_threshold', 'refresh_every')):
+        parser.error("--tile-size, --tile-threshold and --refresh-every only apply to --incremental")
+    if args.verify_bgr_table and not args.bgr_table:
+        parser.error("--verify-bgr-table needs --bgr-table")
+    if args.profile and args.segments > 0:
+        parser.error("--profile is not available with --segments")
+    if args.bgr_table and args.incremental:
+        parser.error("--bgr-table and --incremental cannot be combined")
+    if args.profiles and (args.bgr_table or args.incremental or args.segments > 0):
+        parser.error("--profiles cannot be combined with --bgr-table, --incremental or --segments")
+    return args
+
+
+def frame_window(cap, args):
+    """
+    แปลงช่วงเวลา --start/--end (วินาที) เป็น (start_frame, end_frame) ของวิดีโอ
+    """
+    fps = video_properties(cap)[0] or 30.0  # บางไฟล์ไม่มีค่า FPS
+    start_frame = int(round(args.start * fps))
+    end_frame = int(round(args.end * fps)) if args.end is not None else None
+    return start_frame, end_frame
+
+
+def stats_only(video_path, processor, args, profiler=NULL_PROFILER):
+    """
+    โหมด --stats-only: เปิดวิดีโอ คำนวณสถิติในช่วงเวลาที่กำหนด และบันทึกไฟล์สถิติ
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"ไม่สามารถเปิดไฟล์วิดีโอได้ที่ {video_path}")
+        return 1
+    start_frame, end_frame = frame_window(cap, args)
+
+    try:
+        start = time.perf_counter()
+        frame_indices, frame_stats = run_stats_only(cap, processor, args.stride, start_frame, end_frame, profiler)
+        elapsed = time.perf_counter() - start
+    finally:
+        cap.release()
+
+    print(f"วิเคราะห์ {len(frame_stats)} เฟรม (ทุก {args.stride} เฟรม) ใน {elapsed:.2f} วินาที "
+          f"({len(frame_stats) / elapsed if elapsed > 0 else 0.0:.1f} frames/s)")
+    if profiler.enabled:
+        profiler.print_summary()
+        summary_path, trace_path = profiler.export(args.profile)
+        print(f"เวลาแต่ละขั้นตอนถูกบันทึกที่: {summary_path}, {trace_path}")
+
+    write_frame_stats(args.stats, frame_stats, frame_indices)
+    print(f"สถิติรายเฟรมถูกบันทึกที่: {args.stats}")
+    return 0
+
+
+def multi_profile(args, profiler=NULL_PROFILER):
+    """
+    โหมด --profiles: ถอดรหัสและแปลงสีแต่ละเฟรมครั้งเดียว แล้วประเมินทุก Profile บนเฟรมเดียวกัน
+    บันทึกสถิติรายเฟรมแยกไฟล์ต่อ Profile และวิดีโอผลลัพธ์ต่อ Profile (ยกเว้นเมื่อใช้ --stats-only)
+    """
+    config = configparser.ConfigParser()
+    config.read(args.config)
+    video_path = config.get('Paths', 'video_path')
+    processor = MultiProfileProcessor(load_profiles(args.profiles))
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"ไม่สามารถเปิดไฟล์วิดีโอได้ที่ {video_path}")
+        return 1
+
+    frame_indices = None
+    output_paths = []
+    try:
+        start = time.perf_counter()
+        if args.stats_only:
+            start_frame, end_frame = frame_window(cap, args)
+            frame_indices, frame_stats = run_stats_only(cap, processor, args.stride, start_frame, end_frame, profiler)
+        else:
+            fps, frame_size, _ = video_properties(cap)
+            output_paths = [profile_path(args.output, name) for name in processor.names]
+            writers = []
+            for output_video_path in output_paths:
+                writer = open_writer(output_video_path, fps, frame_size)
+                if writer is None:
+                    ProfileWriters(writers).release()
+                    return 1
+                writers.append(writer)
+            out = ProfileWriters(writers)
+            try:
+                _, frame_stats = run_headless(cap, out, processor, args.queue_size, profiler)
+            finally:
+                out.release()
+        elapsed = time.perf_counter() - start
+    finally:
+        cap.release()
+
+    print(f"ประเมิน {len(processor.names)} Profile บน {len(frame_stats)} เฟรม ใน {elapsed:.2f} วินาที "
+          f"({len(frame_stats) / elapsed if elapsed > 0 else 0.0:.1f} frames/s)")
+    if profiler.enabled:
+        profiler.print_summary()
+        summary_path, trace_path = profiler.export(args.profile)
+        print(f"เวลาแต่ละขั้นตอนถูกบันทึกที่: {summary_path}, {trace_path}")
+
+    # สรุปค่าเฉลี่ยของแต่ละ Profile เพื่อเปรียบเทียบ
+    print(f"{'Profile':<24} {'Accuracy':>10} {'Tracking':>10}")
+    for position, name in enumerate(processor.names):
+        profile_stats = [stats[position] for stats in frame_stats]
+        mean_accuracy, mean_tracking = np.mean(profile_stats, axis=0) if profile_stats else (0.0, 0.0)
+        print(f"{name:<24} {mean_accuracy:>9.2f}% {mean_tracking:>9.2f}%")
+        if args.stats:
+            write_frame_stats(profile_path(args.stats, name), profile_stats, frame_indices)
+
+    if args.stats:
+        print(f"สถิติรายเฟรมของแต่ละ Profile ถูกบันทึกที่: {profile_path(args.stats, '<profile>')}")
+    for output_video_path in output_paths:
+        print(f"วิดีโอที่ประมวลผลแล้วถูกบันทึกที่: {output_video_path}")
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profiles:
+        return multi_profile(args, FrameProfiler() if args.profile else NULL_PROFILER)
+
+    video_path, HSV_Custom_Lower, HSV_Custom_Upper, final_table = load_settings(args.config)
+    profiler = FrameProfiler() if args.profile else NULL_PROFILER
+    if args.bgr_table:
+        hsv_tables = bgr_tables(HSV_Custom_Lower, HSV_Custom_Upper, final_table)
+        bgr_table = load_bgr_table(hsv_tables)
+        if args.verify_bgr_table:
+            mismatches = verify_bgr_table(bgr_table, hsv_tables)
+            if mismatches:
+                print(f"ตาราง BGR ไม่ตรงกับการประมวลผลแบบ HSV: {mismatches} สี")
+                return 1
+            print("ตาราง BGR ตรงกับการประมวลผลแบบ HSV ทุกสี")
+        processor = BgrFrameProcessor(HSV_Custom_Lower, HSV_Custom_Upper, final_table, bgr_table)
+    elif args.incremental:
+        processor = IncrementalFrameProcessor(HSV_Custom_Lower, HSV_Custom_Upper, final_table,
+                                              tile_size=args.tile_size, threshold=args.tile_threshold,
+                                              refresh_every=args.refresh_every)
+    else:
+        processor = FrameProcessor(HSV_Custom_Lower, HSV_Custom_Upper, final_table)
+
+    if args.stats_only:
+        return stats_only(video_path, processor, args, profiler)
+
+    output_video_path = args.output
+    if args.segments > 0:
+        start = time.perf_counter()
+        frame_stats = run_segments(video_path, output_video_path, args.segments, processor)
+        if frame_stats is None:
+            return 1
+        elapsed = time.perf_counter() - start
+        print(f"ประมวลผล {len(frame_stats)} เฟรม ด้วย {args.segments} Process ใน {elapsed:.2f} วินาที "
+              f"({len(frame_stats) / elapsed if elapsed > 0 else 0.0:.1f} frames/s)")
+    else:
+        cap, out = open_video(video_path, output_video_path)
+        if cap is None:
+            return 1
+
+        try:
+            if args.headless:
+                start = time.perf_counter()
+                stages, frame_stats = run_headless(cap, out, processor, args.queue_size, profiler)
+                elapsed = time.perf_counter() - start
+                frames = stages[-1].frames
+                print(f"ประมวลผล {frames} เฟรม ใน {elapsed:.2f} วินาที ({frames / elapsed if elapsed > 0 else 0.0:.1f} frames/s)")
+                for stage in stages:
+                    print(f"  {stage.name:<7} {stage.frames} frames, {stage.fps():.1f} frames/s")
+            else:
+                frame_stats = run_interactive(cap, out, processor, profiler)
+            if args.incremental and processor.tiles_seen:
+                print(f"Tile ที่คำนวณใหม่: {processor.tiles_recomputed}/{processor.tiles_seen} "
+                      f"({processor.tiles_recomputed / processor.tiles_seen * 100:.1f}%)")
+        finally:
+            # **19. ปิดการอ่านไฟล์และเขียนไฟล์**
+            cap.release()
+            out.release()
 
-    # **17. แสดงผลลัพธ์ (ภาพรวมในหน้าต่างเดียว) พร้อมตัวหนังสือปรับขนาด**
-    cv2.putText(combined_image, f'Accuracy: {accuracy_percentage:.2f}%', (10, mask_height + 20), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
-    cv2.putText(combined_image, f'Tracking Efficiency: {tracking_efficiency:.2f}%', (mask_width + 10, mask_height + 20), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
-    
-    # บันทึกผลลัพธ์ลงในไฟล์
-    out.write(combined_image)
+    if profiler.enabled:
+        profiler.print_summary()
+        summary_path, trace_path = profiler.export(args.profile)
+        print(f"เวลาแต่ละขั้นตอนถูกบันทึกที่: {summary_path}, {trace_path}")
 
-    # **18. แสดงผล**
-    cv2.imshow('Original vs Processed', combined_image)
+    if args.stats:
+        write_frame_stats(args.stats, frame_stats)
+        print(f"สถิติรายเฟรมถูกบันทึกที่: {args.stats}")
 
-    # รอการกดปุ่ม 'q' เพื่อออกจากการแสดงผล
-    if cv2.waitKey(delay) & 0xFF == ord('q'):
-        break
+    print(f"วิดีโอที่ประมวลผลแล้วถูกบันทึกที่: {output_video_path}")
+    return 0
 
-# **19. ปิดการอ่านไฟล์และเขียนไฟล์**
-cap.release()
-out.release()
-cv2.destroyAllWindows()
 
-print(f"วิดีโอที่ประมวลผลแล้วถูกบันทึกที่: {output_video_path}")
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,155 +1,534 @@
+import argparse
+import csv
 import cv2
+import glob
 import numpy as np
-import sys
 import configparser
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 
-# **1. อ่านค่า Config จากไฟล์ .ini**
-config = configparser.ConfigParser()
-config.read('Config_Image.ini')
-
-# อ่าน path สำหรับรูปภาพและไฟล์สีที่ไม่ต้องการ
-image_path = config.get('Paths', 'image_path')
-undesired_colors_file_path = config.get('Paths', 'undesired_colors_file_path')
-
-# อ่านค่าของ HSV Custom Lower และ Upper จากไฟล์ .ini
-HSV_Custom_Lower = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Lower').split(',')])
-HSV_Custom_Upper = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Upper').split(',')])
-
-undesired_colors_hsv = []
-
-# **2. อ่านค่าสีที่ไม่ต้องการจากไฟล์ (ถ้ามี)**
-try:
-    with open(undesired_colors_file_path, 'r') as file:
-        line = file.readline()
-        if line.startswith("Undesired colors:"):
-            colors_string = line.split(": ")[1]
-            color_groups = colors_string.strip().split(";")
-            for color_group in color_groups:
-                color_str = color_group.strip("[]").split(",")
-                if len(color_str) == 3:
-                    h, s, v = map(int, color_str)
-                    undesired_colors_hsv.append(np.array([h, s, v]))
-        else:
-            print(f"คำเตือน: รูปแบบไฟล์สีที่ไม่ต้องการอาจไม่ถูกต้อง: {undesired_colors_file_path}")
-
-except FileNotFoundError:
-    print(f"คำเตือน: ไม่พบไฟล์สีที่ไม่ต้องการ: {undesired_colors_file_path}")
-except Exception as e:
-    print(f"คำเตือน: ข้อผิดพลาดในการอ่านไฟล์สีที่ไม่ต้องการ: {e}")
-
-if undesired_colors_hsv:
-    print("สีที่ไม่ต้องการที่อ่านจากไฟล์:")
-    for color in undesired_colors_hsv:
-        print(f"  HSV: {color}")
-else:
-    print("ไม่มีสีที่ไม่ต้องการถูกโหลดจากไฟล์ หรือไฟล์ไม่มี")
-
-# **3. สร้างหน้าต่างแสดงผล**
-combined_window_name = 'Combined Color Aimbot View'
-cv2.namedWindow(combined_window_name, cv2.WINDOW_NORMAL)
-cv2.resizeWindow(combined_window_name, 900, 600)
-
-# **4. โหลดรูปภาพ (จากไฟล์ที่ได้จาก Config)**
-try:
+from bgr_engine import class_mask, classify_bgr, load_bgr_table, verify_bgr_table
+from color_engine import (DESIRED_CLASS, FINAL_CLASS, UNDESIRED_CLASS, compile_color_table,
+                          lookup, mask_table, new_occupancy)
+from color_store import read_color_set
+from frame_profiler import NULL_PROFILER, FrameProfiler
+from main import _ordered_results, list_images
+from strip_io import PngStripWriter, image_strips
+
+DEFAULT_MEMORY_BUDGET_MB = 1024
+# Peak working memory per source pixel of process_image + compose_result (HSV, packed keys,
+# four masks, and the 2x2 composite which alone is 12 bytes per source pixel)
+IMAGE_BYTES_PER_PIXEL = 48
+# Same for one strip of process_image_tiled (strip masks, composite rows and PNG row filtering)
+STRIP_BYTES_PER_PIXEL = 64
+PREVIEW_WIDTH = 1800  # ความกว้างภาพตัวอย่างที่แสดงบนหน้าต่างในโหมดแบ่งแถบ
+
+
+def load_settings(config_path='Config_Image.ini'):
+    """
+    อ่านค่า Config และไฟล์สีที่ไม่ต้องการ แล้วคอมไพล์เป็นตาราง Lookup
+    Returns (image_path, (desired_table, undesired_table, final_table))
+    """
+    # **1. อ่านค่า Config จากไฟล์ .ini**
+    config = configparser.ConfigParser()
+    config.read(config_path)
+
+    # อ่าน path สำหรับรูปภาพและไฟล์สีที่ไม่ต้องการ
+    image_path = config.get('Paths', 'image_path')
+    undesired_colors_file_path = config.get('Paths', 'undesired_colors_file_path')
+
+    # อ่านค่าของ HSV Custom Lower และ Upper จากไฟล์ .ini
+    HSV_Custom_Lower = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Lower').split(',')])
+    HSV_Custom_Upper = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Upper').split(',')])
+
+    undesired_colors_hsv = new_occupancy()
+
+    # **2. อ่านค่าสีที่ไม่ต้องการจากไฟล์ (รองรับทั้งไฟล์ไบนารี .hsvset และไฟล์ข้อความแบบเดิม)**
+    try:
+        undesired_colors_hsv = read_color_set(undesired_colors_file_path)
+    except FileNotFoundError:
+        print(f"คำเตือน: ไม่พบไฟล์สีที่ไม่ต้องการ: {undesired_colors_file_path}")
+    except ValueError:
+        print(f"คำเตือน: รูปแบบไฟล์สีที่ไม่ต้องการอาจไม่ถูกต้อง: {undesired_colors_file_path}")
+    except Exception as e:
+        print(f"คำเตือน: ข้อผิดพลาดในการอ่านไฟล์สีที่ไม่ต้องการ: {e}")
+
+    if undesired_colors_hsv.any():
+        print(f"สีที่ไม่ต้องการที่อ่านจากไฟล์: {np.count_nonzero(undesired_colors_hsv)} สี")
+    else:
+        print("ไม่มีสีที่ไม่ต้องการถูกโหลดจากไฟล์ หรือไฟล์ไม่มี")
+
+    # **2.1 คอมไพล์ช่วงสีที่ต้องการและสีที่ไม่ต้องการ (±5) เป็นตาราง Lookup ครั้งเดียว**
+    color_table = compile_color_table(HSV_Custom_Lower, HSV_Custom_Upper, undesired_colors_hsv)
+    tables = (mask_table(color_table, DESIRED_CLASS), mask_table(color_table, UNDESIRED_CLASS),
+              mask_table(color_table, FINAL_CLASS))
+    return image_path, tables
+
+
+def process_image(frame, tables, profiler=NULL_PROFILER, bgr_table=None):
+    """
+    สร้าง Mask ทั้งหมดของภาพและคำนวณค่าสถิติ
+    bgr_table (ถ้ามี) คือตาราง BGR ของ tables (ดู load_bgr_table) ใช้แทนการแปลงภาพเป็น HSV
+    Returns (desired_color_mask, undesired_mask_total, final_mask, masked_output,
+             accuracy_percentage, tracking_efficiency)
+    """
+    desired_table, undesired_table, final_table = tables
+
+    if bgr_table is not None:
+        # **5. อ่าน Class ของทุกพิกเซลจากตาราง BGR ครั้งเดียว แล้วแยกเป็น Mask ตาม bit ของ tables**
+        with profiler.stage('classify'):
+            classes = classify_bgr(bgr_table, frame)
+        with profiler.stage('class_masks'):
+            desired_color_mask = class_mask(classes, 0)
+            undesired_mask_total = class_mask(classes, 1)
+            final_mask = class_mask(classes, 2)
+    else:
+        # **5. ประมวลผลภาพและสร้าง Mask**
+        with profiler.stage('cvtColor'):
+            hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+
+        # **5.1 สร้าง Desired Color Mask**
+        with profiler.stage('desired_mask'):
+            desired_color_mask = lookup(desired_table, hsv_frame)
+
+        # **5.2 สร้าง Undesired Color Mask Total (เปิดตารางครั้งเดียวต่อพิกเซล)**
+        with profiler.stage('undesired_mask'):
+            undesired_mask_total = lookup(undesired_table, hsv_frame)
+
+        # **5.3 สร้าง Final Mask**
+        with profiler.stage('final_mask'):
+            final_mask = lookup(final_table, hsv_frame)
+
+    # **5.4 นำ Final Mask ไปใช้กับภาพต้นฉบับ**
+    with profiler.stage('masked_output'):
+        masked_output = cv2.bitwise_and(frame, frame, mask=final_mask)
+
+    with profiler.stage('stats'):
+        # **6. คำนวณความแม่นยำของสีที่ตรวจพบ**
+        # การคำนวณความแม่นยำ (Precision) จาก Desired Color Mask และ Final Mask
+        total_pixels = frame.size // 3  # พิกเซลทั้งหมดในภาพ (3 = จำนวนช่องสี BGR)
+        correct_detected_pixels = cv2.countNonZero(final_mask)  # จำนวนพิกเซลที่ตรวจพบสีที่ตรงกับ Mask ที่ต้องการ
+        accuracy_percentage = (correct_detected_pixels / total_pixels) * 100
+
+        # **7. คำนวณค่าการติดตามสี (Tracking Efficiency)**
+        # การคำนวณการติดตามสีจาก Desired Color Mask และภาพต้นฉบับ
+        tracking_efficiency = (cv2.countNonZero(desired_color_mask) / total_pixels) * 100
+
+    return (desired_color_mask, undesired_mask_total, final_mask, masked_output,
+            accuracy_percentage, tracking_efficiency)
+
+
+def _font_scale(mask_width):
+    # **10. คำนวณสัดส่วนของรูปภาพ และ ขนาดตัวหนังสือ**
+    base_image_width = 900.0 # ขนาดความกว้างของรูปภาพเริ่มต้นที่เราตั้งไว้
+    image_scale_factor = mask_width * 2 / base_image_width # สัดส่วนของรูปภาพ
+    base_font_scale = 0.5 # ขนาดตัวหนังสือเริ่มต้น
+    return base_font_scale * image_scale_factor # ขนาดตัวหนังสือใหม่ ปรับตามสัดส่วนรูปภาพ
+
+
+def _put_stats_text(image, mask_width, accuracy_percentage, tracking_efficiency, font_scale, top=0):
+    # ตัวหนังสืออยู่ที่ y = 20 ของภาพรวม; top คือแถวแรกของ image ในภาพรวม (ใช้กับแถบของภาพ)
+    cv2.putText(image, f'Accuracy: {accuracy_percentage:.2f}%', (10, 20 - top), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+    cv2.putText(image, f'Tracking Efficiency: {tracking_efficiency:.2f}%', (mask_width + 10, 20 - top), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+
+
+def compose_result(desired_color_mask, undesired_mask_total, final_mask, masked_output,
+                   accuracy_percentage, tracking_efficiency, profiler=NULL_PROFILER):
+    """
+    รวมภาพ Mask ทั้งหมดเป็นภาพ 2x2 พร้อมตัวหนังสือแสดงค่าสถิติ
+    """
+    # **9. รวมภาพ Mask ทั้งหมดในภาพเดียวเพื่อแสดงผล**
+    with profiler.stage('compose'):
+        mask_height, mask_width = desired_color_mask.shape[:2]
+        combined_image_width = mask_width * 2
+        combined_image_height = mask_height * 2
+
+        combined_image = np.zeros((combined_image_height, combined_image_width, 3), dtype=np.uint8)
+
+        desired_color_mask_color = cv2.cvtColor(desired_color_mask, cv2.COLOR_GRAY2BGR)
+        undesired_color_mask_total_color = cv2.cvtColor(undesired_mask_total, cv2.COLOR_GRAY2BGR)
+        final_mask_color = cv2.cvtColor(final_mask, cv2.COLOR_GRAY2BGR)
+
+        combined_image[0:mask_height, 0:mask_width] = desired_color_mask_color
+        combined_image[0:mask_height, mask_width:combined_image_width] = undesired_color_mask_total_color
+        combined_image[mask_height:combined_image_height, 0:mask_width] = final_mask_color
+        combined_image[mask_height:combined_image_height, mask_width:combined_image_width] = masked_output
+
+    # **11. แสดงผลลัพธ์ (ภาพรวมในหน้าต่างเดียว) พร้อมตัวหนังสือปรับขนาด**
+    with profiler.stage('putText'):
+        _put_stats_text(combined_image, mask_width, accuracy_percentage, tracking_efficiency, _font_scale(mask_width))
+    return combined_image
+
+
+def process_image_tiled(frame, tables, output_image_path, memory_budget, compression=1, profiler=NULL_PROFILER,
+                        bgr_table=None):
+    """
+    ประมวลผลภาพขนาดใหญ่ทีละแถบแนวนอน ให้หน่วยความจำที่ใช้ทำงานไม่เกิน memory_budget ไบต์
+    ผลลัพธ์ตรงกับ process_image + compose_result ทุกพิกเซล; ภาพรวม 2x2 ถูกเขียนเป็น PNG ทีละแถบ
+    Returns (accuracy_percentage, tracking_efficiency, preview) โดย preview คือภาพรวมย่อขนาดสำหรับแสดงผล
+    """
+    desired_table, undesired_table, final_table = tables
+    mask_height, mask_width = frame.shape[:2]
+    strips = image_strips(mask_height, mask_width, memory_budget, STRIP_BYTES_PER_PIXEL)
+    font_scale = _font_scale(mask_width)
+    preview_scale = min(1.0, PREVIEW_WIDTH / (mask_width * 2))
+
+    # ตัวหนังสือต้องวาดครบในแถบเดียว (วาดข้ามขอบแถบแบบ Anti-aliased ได้พิกเซลไม่ตรงกับการวาดทั้งภาพ)
+    text_bottom = 20 + max(cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)[1]
+                           for text in ('Accuracy', 'Tracking Efficiency')) + 2
+    if mask_height <= text_bottom:
+        # ภาพเตี้ยกว่าตัวหนังสือ: ตัวหนังสือล้นลงครึ่งล่างของภาพรวม จึงประมวลผลทั้งภาพในแถบเดียว
+        # (ภาพมีไม่กี่แถว หน่วยความจำจึงใกล้เคียงกับแถบแรกที่รวมจนครอบคลุมตัวหนังสืออยู่แล้ว)
+        result = process_image(frame, tables, profiler, bgr_table)
+        combined_image = compose_result(*result, profiler=profiler)
+        with profiler.stage('imwrite'):
+            with PngStripWriter(output_image_path, mask_width * 2, mask_height * 2, compression=compression) as writer:
+                writer.write(combined_image)
+        preview_size = (max(1, round(mask_width * 2 * preview_scale)), max(1, round(mask_height * 2 * preview_scale)))
+        return result[4], result[5], cv2.resize(combined_image, preview_size, interpolation=cv2.INTER_AREA)
+
+    # **5-7. รอบแรก: นับพิกเซลของ Desired และ Final Mask ทีละแถบ (ตัวหนังสือในแถบแรกต้องใช้ค่ารวม)**
+    correct_detected_pixels = desired_pixels = 0
+    for start, stop in strips:
+        if bgr_table is not None:
+            with profiler.stage('classify'):
+                classes = classify_bgr(bgr_table, frame[start:stop])
+            with profiler.stage('stats'):
+                correct_detected_pixels += cv2.countNonZero(class_mask(classes, 2))
+                desired_pixels += cv2.countNonZero(class_mask(classes, 0))
+            continue
+        with profiler.stage('cvtColor'):
+            hsv_strip = cv2.cvtColor(frame[start:stop], cv2.COLOR_BGR2HSV)
+        with profiler.stage('stats'):
+            correct_detected_pixels += cv2.countNonZero(lookup(final_table, hsv_strip))
+            desired_pixels += cv2.countNonZero(lookup(desired_table, hsv_strip))
+    total_pixels = mask_height * mask_width
+    accuracy_percentage = (correct_detected_pixels / total_pixels) * 100
+    tracking_efficiency = (desired_pixels / total_pixels) * 100
+
+    # **9-14. รอบที่สองและสาม: ครึ่งบน (Desired | Undesired) แล้วครึ่งล่าง (Final | Masked) ของภาพรวม**
+    # ตัวหนังสือต้องวาดครบในแถบเดียว จึงรวมแถบแรกของครึ่งบนจนครอบคลุมแถวล่างสุดของตัวหนังสือ
+    top_strips = list(strips)
+    while len(top_strips) > 1 and top_strips[0][1] <= text_bottom:
+        top_strips[:2] = [(top_strips[0][0], top_strips[1][1])]
+
+    preview_strips = []
+    with PngStripWriter(output_image_path, mask_width * 2, mask_height * 2, compression=compression) as writer:
+        for half, half_strips in (('top', top_strips), ('bottom', strips)):
+            for start, stop in half_strips:
+                strip = frame[start:stop]
+                desired_color_mask, undesired_mask_total, final_mask, masked_output = process_image(
+                    strip, tables, profiler, bgr_table)[:4]
+                with profiler.stage('compose'):
+                    combined_strip = np.empty((stop - start, mask_width * 2, 3), dtype=np.uint8)
+                    if half == 'top':
+                        cv2.cvtColor(desired_color_mask, cv2.COLOR_GRAY2BGR, dst=combined_strip[:, :mask_width])
+                        cv2.cvtColor(undesired_mask_total, cv2.COLOR_GRAY2BGR, dst=combined_strip[:, mask_width:])
+                    else:
+                        cv2.cvtColor(final_mask, cv2.COLOR_GRAY2BGR, dst=combined_strip[:, :mask_width])
+                        combined_strip[:, mask_width:] = masked_output
+                if half == 'top':
+                    with profiler.stage('putText'):
+                        _put_stats_text(combined_strip, mask_width, accuracy_percentage, tracking_efficiency,
+                                        font_scale, top=start)
+                with profiler.stage('imwrite'):
+                    writer.write(combined_strip)
+                preview_size = (max(1, round(mask_width * 2 * preview_scale)),
+                                max(1, round((stop - start) * preview_scale)))
+                preview_strips.append(cv2.resize(combined_strip, preview_size, interpolation=cv2.INTER_AREA))
+    return accuracy_percentage, tracking_efficiency, np.vstack(preview_strips)
+
+
+def render_image(image_path, output_image_path, tables, compression=1, memory_budget=None, bgr_table=None):
+    """
+    ประมวลผลภาพหนึ่งภาพสำหรับโหมด Batch และเข้ารหัสภาพรวม 2x2 เป็น PNG
+    Returns (width, height, accuracy_percentage, tracking_efficiency, png_bytes) หรือ None ถ้าโหลดภาพไม่ได้
+    ภาพที่ใหญ่เกิน memory_budget ถูกเขียนลง output_image_path ทีละแถบโดยตรง (png_bytes = None)
+    """
     frame = cv2.imread(image_path)
     if frame is None:
-        print(f"ไม่สามารถโหลดรูปภาพ: '{image_path}' ได้ โปรดตรวจสอบไฟล์")
-        exit()
-except Exception as e:
-    print(f"ข้อผิดพลาดในการโหลดรูปภาพ: {e}")
-    exit()
-
-# **5. ประมวลผลภาพและสร้าง Mask**
-hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-# **5.1 สร้าง Desired Color Mask**
-desired_color_mask = cv2.inRange(hsv_frame, HSV_Custom_Lower, HSV_Custom_Upper)
-
-# **5.2 สร้าง Undesired Color Mask Total**
-undesired_mask_total = np.zeros_like(desired_color_mask)
-for color in undesired_colors_hsv:
-    lower_bound = np.array([max(0, color[0]-5), max(0, color[1]-5), max(0, color[2]-5)])
-    upper_bound = np.array([min(179, color[0]+5), min(255, color[1]+5), min(255, color[2]+5)])
-    undesired_color_mask = cv2.inRange(hsv_frame, lower_bound, upper_bound)
-    undesired_mask_total = cv2.bitwise_or(undesired_mask_total, undesired_color_mask)
-
-# **5.3 สร้าง Final Mask**
-final_mask = cv2.bitwise_and(desired_color_mask, cv2.bitwise_not(undesired_mask_total))
-
-# **5.4 นำ Final Mask ไปใช้กับภาพต้นฉบับ**
-masked_output = cv2.bitwise_and(frame, frame, mask=final_mask)
-
-# **6. คำนวณความแม่นยำของสีที่ตรวจพบ**
-# การคำนวณความแม่นยำ (Precision) จาก Desired Color Mask และ Final Mask
-total_pixels = frame.size // 3  # พิกเซลทั้งหมดในภาพ (3 = จำนวนช่องสี BGR)
-correct_detected_pixels = cv2.countNonZero(final_mask)  # จำนวนพิกเซลที่ตรวจพบสีที่ตรงกับ Mask ที่ต้องการ
-accuracy_percentage = (correct_detected_pixels / total_pixels) * 100
-
-# **7. คำนวณค่าการติดตามสี (Tracking Efficiency)**
-# การคำนวณการติดตามสีจาก Desired Color Mask และภาพต้นฉบับ
-tracking_efficiency = (cv2.countNonZero(desired_color_mask) / total_pixels) * 100
-
-# **8. แสดงผลลัพธ์การคำนวณ**
-print(f"Accuracy of detected color: {accuracy_percentage:.2f}%")
-print(f"Tracking efficiency: {tracking_efficiency:.2f}%")
-
-# **9. รวมภาพ Mask ทั้งหมดในภาพเดียวเพื่อแสดงผล**
-mask_height, mask_width = desired_color_mask.shape[:2]
-combined_image_width = mask_width * 2
-combined_image_height = mask_height * 2
-
-combined_image = np.zeros((combined_image_height, combined_image_width, 3), dtype=np.uint8)
-
-desired_color_mask_color = cv2.cvtColor(desired_color_mask, cv2.COLOR_GRAY2BGR)
-undesired_color_mask_total_color = cv2.cvtColor(undesired_mask_total, cv2.COLOR_GRAY2BGR)
-final_mask_color = cv2.cvtColor(final_mask, cv2.COLOR_GRAY2BGR)
-
-combined_image[0:mask_height, 0:mask_width] = desired_color_mask_color
-combined_image[0:mask_height, mask_width:combined_image_width] = undesired_color_mask_total_color
-combined_image[mask_height:combined_image_height, 0:mask_width] = final_mask_color
-combined_image[mask_height:combined_image_height, mask_width:combined_image_width] = masked_output
-
-# **10. คำนวณสัดส่วนของรูปภาพ และ ขนาดตัวหนังสือ**
-base_image_width = 900.0 # ขนาดความกว้างของรูปภาพเริ่มต้นที่เราตั้งไว้
-image_scale_factor = combined_image_width / base_image_width # สัดส่วนของรูปภาพ
-base_font_scale = 0.5 # ขนาดตัวหนังสือเริ่มต้น
-font_scale = base_font_scale * image_scale_factor # ขนาดตัวหนังสือใหม่ ปรับตามสัดส่วนรูปภาพ
-
-# **11. แสดงผลลัพธ์ (ภาพรวมในหน้าต่างเดียว) พร้อมตัวหนังสือปรับขนาด**
-cv2.putText(combined_image, f'Accuracy: {accuracy_percentage:.2f}%', (10, 20), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
-cv2.putText(combined_image, f'Tracking Efficiency: {tracking_efficiency:.2f}%', (mask_width + 10, 20), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
-cv2.imshow(combined_window_name, combined_image)
-
-# **12. สร้างโฟลเดอร์ Output ถ้ายังไม่มี**
-output_folder = 'Out_Put'
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
-
-# **13. ตั้งชื่อไฟล์ภาพ**
-timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-output_image_path = os.path.join(output_folder, f"result_{timestamp}.png")
-
-# **14. บันทึกภาพผลลัพธ์**
-cv2.imwrite(output_image_path, combined_image)
-print(f"ผลลัพธ์ภาพถูกบันทึกไว้ที่: {output_image_path}")
-
-# **15. รอรับการกดปุ่ม (F9 หรือ ปุ่ม q เพื่อออก)**
-running = True
-while running:
-    key = cv2.waitKey(1)
-    if key == 133:  # ปุ่ม F9
-        print("Exit program by F9 key")
-        running = False
-    elif key == ord('q'):  # ปุ่ม q
-        print("Exit program by pressing 'q' key")
-        running = False
-    elif key == -1:
-        pass  # ปิดหน้าต่าง
-
-    if not running:
-        break
-
-# **16. ปิดโปรแกรมและหน้าต่างทั้งหมด**
-cv2.destroyAllWindows()
+        return None
+    height, width = frame.shape[:2]
+
+    if memory_budget is not None and height * width * IMAGE_BYTES_PER_PIXEL > memory_budget:
+        accuracy_percentage, tracking_efficiency, _ = process_image_tiled(frame, tables, output_image_path,
+                                                                          memory_budget, compression,
+                                                                          bgr_table=bgr_table)
+        return width, height, accuracy_percentage, tracking_efficiency, None
+
+    result = process_image(frame, tables, bgr_table=bgr_table)
+    _, png = cv2.imencode('.png', compose_result(*result), [cv2.IMWRITE_PNG_COMPRESSION, compression])
+    return width, height, result[4], result[5], png
+
+
+# ตาราง Lookup ของ Process ทำงานในโหมด Batch (ส่งให้แต่ละ Process ครั้งเดียวตอนเริ่ม)
+_batch_tables = None
+_batch_bgr_table = None
+
+
+def _init_batch_worker(tables, bgr_table=None):
+    global _batch_tables, _batch_bgr_table
+    _batch_tables = tables
+    _batch_bgr_table = bgr_table
+
+
+def _render_task(task):
+    image_path, output_image_path, compression, memory_budget = task
+    return render_image(image_path, output_image_path, _batch_tables, compression, memory_budget, _batch_bgr_table)
+
+
+def batch_inputs(inputs):
+    """
+    รวมรายชื่อไฟล์ภาพจากโฟลเดอร์และ Glob pattern (เรียงตามชื่อ ไม่ซ้ำกัน)
+    """
+    image_paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = list_images(pattern)
+        else:
+            matches = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+        image_paths.extend(sorted(matches))
+    return list(dict.fromkeys(image_paths))
+
+
+def batch_output_paths(image_paths, output_folder):
+    """
+    ตั้งชื่อไฟล์ผลลัพธ์ result_<ชื่อภาพ>.png ของแต่ละภาพ เติมเลขลำดับถ้าชื่อภาพซ้ำกัน
+    """
+    output_paths = []
+    used = set()
+    for image_path in image_paths:
+        stem = os.path.splitext(os.path.basename(image_path))[0]
+        name, index = f"result_{stem}.png", 1
+        while name in used:
+            name, index = f"result_{stem}_{index}.png", index + 1
+        used.add(name)
+        output_paths.append(os.path.join(output_folder, name))
+    return output_paths
+
+
+def run_batch(image_paths, tables, output_folder, workers=1, compression=1, memory_budget=None, bgr_table=None):
+    """
+    ประมวลผลหลายภาพโดยไม่เปิดหน้าต่าง: คำนวณใน Process pool (ส่งตาราง Lookup ให้แต่ละ Process ครั้งเดียว)
+    และเขียนไฟล์ PNG ใน Thread เบื้องหลังทันทีที่ได้ผลแต่ละภาพ
+    มีงานค้างอยู่ไม่เกิน workers * 2 ภาพ และรอเขียนไม่เกินหนึ่งภาพ หน่วยความจำจึงไม่โตตามจำนวนภาพ
+    Returns แถวรายงานต่อภาพ (image, output, width, height, accuracy, tracking_efficiency) ตามลำดับภาพ
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    output_paths = batch_output_paths(image_paths, output_folder)
+    tasks = [(image_path, output_path, compression, memory_budget)
+             for image_path, output_path in zip(image_paths, output_paths)]
+
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                   initargs=(tables, bgr_table))
+        results = _ordered_results(pool, _render_task, tasks, workers * 2)
+    else:
+        pool = None
+        _init_batch_worker(tables, bgr_table)
+        results = map(_render_task, tasks)
+
+    rows = []
+    start = time.perf_counter()
+    # การเขียนไฟล์ลงดิสก์ทำใน Thread เบื้องหลัง ซ้อนกับการประมวลผลภาพถัดไป
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending_write = None
+        try:
+            for done, (task, result) in enumerate(zip(tasks, results), start=1):
+                image_path, output_path = task[:2]
+                if result is None:
+                    print(f"ไม่สามารถโหลดรูปภาพ: '{image_path}' ได้ ข้ามไป")
+                    continue
+                width, height, accuracy_percentage, tracking_efficiency, png = result
+                if png is not None:
+                    # รอให้ภาพก่อนหน้าเขียนเสร็จก่อน จึงมี PNG ค้างในหน่วยความจำไม่เกินหนึ่งภาพ
+                    if pending_write is not None:
+                        pending_write.result()
+                    pending_write = writer.submit(png.tofile, output_path)
+                rows.append((image_path, output_path, width, height, accuracy_percentage, tracking_efficiency))
+                elapsed = time.perf_counter() - start
+                print(f"\r  ประมวลผลแล้ว {done}/{len(tasks)} ภาพ ({done / elapsed if elapsed > 0 else 0.0:.1f} ภาพ/วินาที)",
+                      end="\n" if done == len(tasks) else "", flush=True)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        if pending_write is not None:
+            pending_write.result()
+    return rows
+
+
+def write_batch_report(report_path, rows):
+    """
+    บันทึกรายงานรวมของโหมด Batch เป็น CSV (หนึ่งแถวต่อภาพ และแถวสรุปท้ายไฟล์)
+    Returns ค่าสรุป (mean_accuracy, mean_tracking, pixel_accuracy, pixel_tracking)
+    """
+    accuracy = np.array([row[4] for row in rows], dtype=np.float64)
+    tracking = np.array([row[5] for row in rows], dtype=np.float64)
+    pixels = np.array([row[2] * row[3] for row in rows], dtype=np.float64)
+    if rows:
+        # ค่าเฉลี่ยต่อภาพ และค่ารวมถ่วงน้ำหนักตามจำนวนพิกเซล (เหมือนนับพิกเซลทุกภาพรวมกัน)
+        summary = (accuracy.mean(), tracking.mean(),
+                   float(np.dot(accuracy, pixels) / pixels.sum()), float(np.dot(tracking, pixels) / pixels.sum()))
+    else:
+        summary = (0.0, 0.0, 0.0, 0.0)
+
+    folder = os.path.dirname(report_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['image', 'output', 'width', 'height', 'accuracy', 'tracking_efficiency'])
+        for image_path, output_path, width, height, accuracy_percentage, tracking_efficiency in rows:
+            writer.writerow([image_path, output_path, width, height,
+                             f'{accuracy_percentage:.6f}', f'{tracking_efficiency:.6f}'])
+        writer.writerow(['MEAN', '', '', '', f'{summary[0]:.6f}', f'{summary[1]:.6f}'])
+        writer.writerow(['ALL_PIXELS', '', '', int(pixels.sum()), f'{summary[2]:.6f}', f'{summary[3]:.6f}'])
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Show and save the HSV color masks of one image.")
+    parser.add_argument('--config', default='Config_Image.ini', help="path of the image config file")
+    parser.add_argument('--memory-budget-mb', type=float, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="process images whose working memory would exceed this budget (besides the decoded "
+                             f"image) in horizontal strips, writing the result PNG strip by strip "
+                             f"(default: {DEFAULT_MEMORY_BUDGET_MB})")
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help="time every stage and write PREFIX.summary.json and a PREFIX.trace.json "
+                             "Chrome-trace/Perfetto timeline")
+    parser.add_argument('--bgr-table', action='store_true',
+                        help="classify the raw BGR pixels with a precomputed 16.7M-entry table instead of "
+                             "converting them to HSV (built once per configuration and cached on disk)")
+    parser.add_argument('--verify-bgr-table', action='store_true',
+                        help="with --bgr-table, check the table against the HSV pipeline for every BGR color first")
+    parser.add_argument('--batch', nargs='+', metavar='INPUT',
+                        help="non-interactive batch mode over these folders and/or glob patterns "
+                             "(e.g. 'shots/**/*.png') instead of image_path from the config")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes of --batch (default: all cores)")
+    parser.add_argument('--output-dir', default='Out_Put', help="folder of the --batch result_*.png files")
+    parser.add_argument('--png-compression', type=int, default=1, choices=range(10), metavar='0-9',
+                        help="PNG compression level of the --batch results (default: 1, fastest)")
+    parser.add_argument('--report', default=os.path.join('Out_Put', 'batch_report.csv'),
+                        help="aggregate per-image CSV report of --batch")
+    return parser.parse_args(argv)
+
+
+def batch_main(args, tables, bgr_table=None):
+    """
+    โหมด --batch: ประมวลผลทุกภาพที่ระบุ บันทึกผลลัพธ์และรายงานรวม โดยไม่เปิดหน้าต่าง
+    """
+    image_paths = batch_inputs(args.batch)
+    if not image_paths:
+        print("ไม่พบไฟล์ภาพตามที่ระบุ")
+        return 1
+    print(f"ประมวลผล {len(image_paths)} ภาพ ด้วย {args.workers} Process")
+
+    start = time.perf_counter()
+    rows = run_batch(image_paths, tables, args.output_dir, args.workers, args.png_compression,
+                     args.memory_budget_mb * 1024 * 1024, bgr_table)
+    elapsed = time.perf_counter() - start
+    mean_accuracy, mean_tracking, pixel_accuracy, pixel_tracking = write_batch_report(args.report, rows)
+
+    print(f"ประมวลผล {len(rows)} ภาพ ใน {elapsed:.2f} วินาที ({len(rows) / elapsed if elapsed > 0 else 0.0:.1f} ภาพ/วินาที)")
+    print(f"Accuracy of detected color: mean {mean_accuracy:.2f}%, all pixels {pixel_accuracy:.2f}%")
+    print(f"Tracking efficiency: mean {mean_tracking:.2f}%, all pixels {pixel_tracking:.2f}%")
+    print(f"รายงานรวมถูกบันทึกไว้ที่: {args.report}")
+    return 0 if len(rows) == len(image_paths) else 1
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = FrameProfiler() if args.profile else NULL_PROFILER
+    image_path, tables = load_settings(args.config)
+
+    # **2.2 ตาราง BGR → Class (bit 0/1/2 = Desired/Undesired/Final) สำหรับ --bgr-table**
+    bgr_table = None
+    if args.bgr_table:
+        bgr_table = load_bgr_table(tables)
+        if args.verify_bgr_table:
+            mismatches = verify_bgr_table(bgr_table, tables)
+            if mismatches:
+                print(f"ตาราง BGR ไม่ตรงกับการประมวลผลแบบ HSV: {mismatches} สี")
+                return 1
+            print("ตาราง BGR ตรงกับการประมวลผลแบบ HSV ทุกสี")
+
+    if args.batch:
+        return batch_main(args, tables, bgr_table)
+
+    # **3. สร้างหน้าต่างแสดงผล**
+    combined_window_name = 'Combined Color Aimbot View'
+    cv2.namedWindow(combined_window_name, cv2.WINDOW_NORMAL)
+    cv2.resizeWindow(combined_window_name, 900, 600)
+
+    # **4. โหลดรูปภาพ (จากไฟล์ที่ได้จาก Config)**
+    try:
+        with profiler.stage('imread'):
+            frame = cv2.imread(image_path)
+        if frame is None:
+            print(f"ไม่สามารถโหลดรูปภาพ: '{image_path}' ได้ โปรดตรวจสอบไฟล์")
+            return 1
+    except Exception as e:
+        print(f"ข้อผิดพลาดในการโหลดรูปภาพ: {e}")
+        return 1
+
+    # **12. สร้างโฟลเดอร์ Output ถ้ายังไม่มี**
+    output_folder = 'Out_Put'
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    # **13. ตั้งชื่อไฟล์ภาพ**
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_image_path = os.path.join(output_folder, f"result_{timestamp}.png")
+
+    memory_budget = args.memory_budget_mb * 1024 * 1024
+    if frame.shape[0] * frame.shape[1] * IMAGE_BYTES_PER_PIXEL > memory_budget:
+        # **5-14. ภาพใหญ่เกินงบหน่วยความจำ: ประมวลผลและบันทึกทีละแถบ**
+        accuracy_percentage, tracking_efficiency, combined_image = process_image_tiled(
+            frame, tables, output_image_path, memory_budget, profiler=profiler, bgr_table=bgr_table)
+    else:
+        result = process_image(frame, tables, profiler, bgr_table)
+        accuracy_percentage, tracking_efficiency = result[4:]
+        combined_image = compose_result(*result, profiler=profiler)
+
+        # **14. บันทึกภาพผลลัพธ์**
+        with profiler.stage('imwrite'):
+            cv2.imwrite(output_image_path, combined_image)
+
+    # **8. แสดงผลลัพธ์การคำนวณ**
+    print(f"Accuracy of detected color: {accuracy_percentage:.2f}%")
+    print(f"Tracking efficiency: {tracking_efficiency:.2f}%")
+
+    cv2.imshow(combined_window_name, combined_image)
+    print(f"ผลลัพธ์ภาพถูกบันทึกไว้ที่: {output_image_path}")
+
+    if profiler.enabled:
+        profiler.print_summary()
+        summary_path, trace_path = profiler.export(args.profile)
+        print(f"เวลาแต่ละขั้นตอนถูกบันทึกที่: {summary_path}, {trace_path}")
+
+    # **15. รอรับการกดปุ่ม (F9 หรือ ปุ่ม q เพื่อออก)**
+    running = True
+    while running:
+        key = cv2.waitKey(1)
+        if key == 133:  # ปุ่ม F9
+            print("Exit program by F9 key")
+            running = False
+        elif key == ord('q'):  # ปุ่ม q
+            print("Exit program by pressing 'q' key")
+            running = False
+        elif key == -1:
+            pass  # ปิดหน้าต่าง
+
+        if not running:
+            break
+
+    # **16. ปิดโปรแกรมและหน้าต่างทั้งหมด**
+    cv2.destroyAllWindows()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
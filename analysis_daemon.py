@@ -0,0 +1,282 @@
+import argparse
+import configparser
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import cv2
+import numpy as np
+from colorama import Fore, init, Style
+
+from color_engine import DESIRED_CLASS, FINAL_CLASS, UNDESIRED_CLASS, compile_color_table, mask_table, new_occupancy
+from color_store import color_set_path, existing_color_set_path, read_color_set
+from histogram_cache import HistogramCache
+from main import DEFAULT_CACHE_DIR, extract_unique_colors, load_config
+from Test_aimbot_image import compose_result, process_image
+from Test_aimbot_Video import FrameProcessor, read_undesired_path, write_frame_stats
+from Test_aimbot_Video import load_settings as load_video_settings
+
+# Set up colorama for console output
+init(autoreset=True)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOCKET = os.path.join(SCRIPT_DIR, "Out_Put", "analysis_daemon.sock")
+
+
+class Settings:
+    """
+    One loaded configuration: the image HSV range with its compiled lookup tables, the video
+    HSV range and final table exactly as Test_aimbot_Video.py loads them, and the HSV range
+    main.py uses for folder analysis.
+    """
+
+    def __init__(self, image_config, folder_config, video_config):
+        config = configparser.ConfigParser()
+        config.read(image_config, encoding='utf-8')
+        self.hsv_lower = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Lower').split(',')])
+        self.hsv_upper = np.array([int(x) for x in config.get('HSV_Values', 'HSV_Custom_Upper').split(',')])
+        self.undesired_path = os.path.join(SCRIPT_DIR, config.get('Paths', 'undesired_colors_file_path'))
+
+        undesired_colors = new_occupancy()
+        undesired_file = existing_color_set_path(self.undesired_path)
+        try:
+            undesired_colors = read_color_set(undesired_file)
+        except FileNotFoundError:
+            print(Fore.YELLOW + f"Undesired color file not found: {undesired_file}" + Style.RESET_ALL)
+        except ValueError:
+            print(Fore.YELLOW + f"Undesired color file may be malformed: {undesired_file}" + Style.RESET_ALL)
+        except Exception as e:
+            print(Fore.YELLOW + f"Error reading undesired color file {undesired_file}: {e}" + Style.RESET_ALL)
+        self.undesired_count = int(np.count_nonzero(undesired_colors))
+
+        color_table = compile_color_table(self.hsv_lower, self.hsv_upper, undesired_colors)
+        self.tables = (mask_table(color_table, DESIRED_CLASS), mask_table(color_table, UNDESIRED_CLASS),
+                       mask_table(color_table, FINAL_CLASS))
+        _, self.video_lower, self.video_upper, self.video_final_table = load_video_settings(video_config)
+        video_settings = configparser.ConfigParser()
+        video_settings.read(video_config)
+        self.video_undesired_path = read_undesired_path(video_settings)
+        self.folder_lower, self.folder_upper = load_config(folder_config)
+        self.loaded_at = time.time()
+
+
+class AnalysisState:
+    """
+    Keeps the current Settings warm and reloads them when one of the watched files changes.
+
+    The watched files are the image config, config.ini, the video config and the undesired color
+    files of the image and video settings; their mtimes are compared before every request, which
+    costs a few stat() calls.
+    """
+
+    def __init__(self, image_config, folder_config, video_config, cache_dir=None):
+        self.image_config = image_config
+        self.folder_config = folder_config
+        self.video_config = video_config
+        self.cache = HistogramCache(cache_dir) if cache_dir else None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._folder_lock = threading.Lock()
+        self._signature = None
+        self._settings = None
+        self.current()
+
+    def _watched_signature(self, settings):
+        paths = [self.image_config, self.folder_config, self.video_config]
+        if settings is not None:
+            # Both the configured path and its .hsvset sibling, since either one may be the file that gets read
+            for path in (settings.undesired_path, settings.video_undesired_path):
+                paths += [path, color_set_path(path)]
+        signature = []
+        for path in paths:
+            try:
+                signature.append((path, os.stat(path).st_mtime_ns))
+            except FileNotFoundError:
+                signature.append((path, None))
+        return signature
+
+    def current(self, force=False):
+        """
+        Return the up-to-date Settings, reloading them first if a watched file changed.
+        """
+        with self._lock:
+            signature = self._watched_signature(self._settings)
+            if force or signature != self._signature:
+                start_time = time.perf_counter()
+                self._settings = Settings(self.image_config, self.folder_config, self.video_config)
+                self._signature = self._watched_signature(self._settings)
+                self.reloads += 1
+                print(Fore.CYAN + f"Loaded settings ({self._settings.undesired_count} undesired colors) in "
+                      f"{time.perf_counter() - start_time:.2f}s" + Style.RESET_ALL)
+            return self._settings
+
+    def mask_image(self, request):
+        """
+        Mask one image file and write its 2x2 result composite.
+        """
+        settings = self.current()
+        image_path = request['path']
+        frame = cv2.imread(image_path)
+        if frame is None:
+            raise ValueError(f"cannot read image: {image_path}")
+        result = process_image(frame, settings.tables)
+        output_path = request.get('output') or os.path.join(
+            SCRIPT_DIR, "Out_Put", f"result_{os.path.splitext(os.path.basename(image_path))[0]}.png")
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        cv2.imwrite(output_path, compose_result(*result))
+        return {'mask_path': output_path, 'accuracy': result[4], 'tracking_efficiency': result[5]}
+
+    def video_stats(self, request):
+        """
+        Compute the per-frame accuracy/tracking statistics of a video without writing a video,
+        with the video settings, so they match Test_aimbot_Video.py on the same file.
+        """
+        settings = self.current()
+        video_path = request['path']
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"cannot open video: {video_path}")
+        processor = FrameProcessor(settings.video_lower, settings.video_upper, settings.video_final_table)
+        frame_stats = []
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_stats.append(processor.analyze(frame))
+        finally:
+            cap.release()
+
+        response = {'frames': len(frame_stats)}
+        if frame_stats:
+            accuracy, tracking = np.mean(frame_stats, axis=0)
+            response.update(accuracy=accuracy, tracking_efficiency=tracking)
+        if request.get('stats'):
+            write_frame_stats(request['stats'], frame_stats)
+            response['stats_path'] = request['stats']
+        return response
+
+    def analyze_folder(self, request):
+        """
+        Run the main.py color analysis over a folder, reusing the warm histogram cache.
+        """
+        settings = self.current()
+        output_folder = request.get('output') or os.path.join(SCRIPT_DIR, "F")
+        # The histogram cache is not thread-safe; folder analyses run one at a time
+        with self._folder_lock:
+            unique_desired, unique_undesired = extract_unique_colors(
+                request['path'], settings.folder_lower, settings.folder_upper, output_folder, cache=self.cache)
+            if self.cache is not None:
+                self.cache.save()
+        total_unique = unique_desired.size + unique_undesired.size
+        accuracy = (unique_desired.size / total_unique * 100) if total_unique > 0 else 0
+        return {'output_folder': output_folder, 'desired_colors': unique_desired.size,
+                'undesired_colors': unique_undesired.size, 'accuracy': accuracy}
+
+    def status(self, request):
+        settings = self.current()
+        return {'reloads': self.reloads, 'loaded_at': settings.loaded_at, 'undesired_colors': settings.undesired_count,
+                'hsv_lower': settings.hsv_lower.tolist(), 'hsv_upper': settings.hsv_upper.tolist(),
+                'video_hsv_lower': settings.video_lower.tolist(), 'video_hsv_upper': settings.video_upper.tolist()}
+
+    def reload(self, request):
+        self.current(force=True)
+        return self.status(request)
+
+
+COMMANDS = {'mask_image': AnalysisState.mask_image, 'video_stats': AnalysisState.video_stats,
+            'analyze_folder': AnalysisState.analyze_folder, 'status': AnalysisState.status,
+            'reload': AnalysisState.reload}
+
+
+def _json_default(value):
+    # numpy scalars in the responses
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Serve newline-delimited JSON requests; every request gets one JSON response line with
+    'ok' and either the command result or an 'error' message.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            start_time = time.perf_counter()
+            try:
+                request = json.loads(line)
+                command = request.get('command')
+                if command == 'shutdown':
+                    response = {'ok': True}
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                elif command in COMMANDS:
+                    response = {'ok': True, **COMMANDS[command](self.server.state, request)}
+                else:
+                    response = {'ok': False, 'error': f"unknown command: {command}"}
+            except Exception as e:
+                response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            response['elapsed_ms'] = (time.perf_counter() - start_time) * 1000
+            self.wfile.write(json.dumps(response, default=_json_default).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class AnalysisServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, state):
+        self.state = state
+        super().__init__(socket_path, RequestHandler)
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line options of the analysis daemon.
+    """
+    parser = argparse.ArgumentParser(
+        description="Keep the configuration and compiled color tables loaded and serve mask/stats/analysis "
+                    "requests over a Unix socket (see daemon_client.py).")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help=f"Unix socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument('--image-config', default=os.path.join(SCRIPT_DIR, 'Config_Image.ini'),
+                        help="config with the HSV range and undesired color file used for images")
+    parser.add_argument('--video-config', default=os.path.join(SCRIPT_DIR, 'Config_Video.ini'),
+                        help="config with the HSV range used for video statistics (as Test_aimbot_Video.py)")
+    parser.add_argument('--config', default=os.path.join(SCRIPT_DIR, 'config.ini'),
+                        help="config with the HSV range used for folder analysis")
+    parser.add_argument('--cache-dir', nargs='?', const=DEFAULT_CACHE_DIR,
+                        help=f"reuse per-image HSV histograms cached in this directory (default: {DEFAULT_CACHE_DIR})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache_dir = os.path.join(SCRIPT_DIR, args.cache_dir) if args.cache_dir else None
+    state = AnalysisState(args.image_config, args.config, args.video_config, cache_dir)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.socket)), exist_ok=True)
+    if os.path.exists(args.socket):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            if probe.connect_ex(args.socket) == 0:
+                print(Fore.RED + f"Another analysis daemon is already listening on {args.socket}" + Style.RESET_ALL)
+                return 1
+        os.remove(args.socket)  # stale socket of a previous run
+    try:
+        with AnalysisServer(args.socket, state) as server:
+            print(Fore.GREEN + f"Analysis daemon listening on {args.socket}" + Style.RESET_ALL)
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+    print("Analysis daemon stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,279 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import cv2
+import numpy as np
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.25  # allowed relative regression before a run fails
+
+# (width, height) of the synthetic images and the generated video; 'smoke' is a tiny fixture
+# set that only exercises the harness
+IMAGE_SIZES = {'smoke': [(64, 48)], 'quick': [(320, 240), (1280, 720)],
+               'full': [(320, 240), (1280, 720), (1920, 1080), (3840, 2160)]}
+UNDESIRED_COUNTS = {'smoke': [10], 'quick': [10, 1000, 10000], 'full': [10, 1000, 10000, 100000]}
+VIDEO_FRAMES = {'smoke': 3, 'quick': 30, 'full': 120}
+VIDEO_SIZE = (1280, 720)
+HSV_LOWER = np.array([20, 100, 100])
+HSV_UPPER = np.array([40, 255, 255])
+
+
+def synthetic_image(width, height, diversity, seed=0):
+    """
+    Deterministic BGR test image. 'low' diversity is a few flat color blocks, 'high' is uniform
+    noise over the whole BGR cube; both contain a yellow target in the desired range.
+    """
+    rng = np.random.default_rng(seed)
+    if diversity == 'low':
+        palette = rng.integers(0, 256, size=(8, 3), dtype=np.uint8)
+        blocks = rng.integers(0, len(palette), size=(height // 16 + 1, width // 16 + 1))
+        image = palette[np.kron(blocks, np.ones((16, 16), dtype=np.int64))[:height, :width]]
+    else:
+        image = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    cv2.circle(image, (width // 3, height // 2), max(4, min(width, height) // 6), (0, 220, 230), -1)
+    return np.ascontiguousarray(image)
+
+
+def synthetic_undesired_colors(count, seed=0):
+    """
+    Deterministic list of 'count' distinct undesired HSV colors.
+    """
+    rng = np.random.default_rng(seed)
+    keys = rng.choice(180 * 256 * 256, size=count, replace=False)
+    return np.stack((keys >> 16, (keys >> 8) & 0xFF, keys & 0xFF), axis=1)
+
+
+def synthetic_video(path, frames, size, seed=0):
+    """
+    Write a deterministic short mp4v video with a moving target over a noisy background.
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, size)
+    for index in range(frames):
+        frame = np.roll(background, index * 4, axis=1)
+        cv2.circle(frame, (50 + index * 8 % size[0], size[1] // 2), size[1] // 8, (0, 220, 230), -1)
+        out.write(frame)
+    out.release()
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_extract(size, diversity, images=4):
+    """
+    main.extract_unique_colors over a folder of synthetic images. Returns pixels/s.
+    """
+    from main import extract_unique_colors
+
+    with tempfile.TemporaryDirectory() as folder:
+        input_folder = os.path.join(folder, 'M')
+        os.makedirs(input_folder)
+        for index in range(images):
+            cv2.imwrite(os.path.join(input_folder, f'{index}.png'), synthetic_image(*size, diversity, seed=index))
+        start = time.perf_counter()
+        extract_unique_colors(input_folder, HSV_LOWER.tolist(), HSV_UPPER.tolist(), os.path.join(folder, 'F'))
+        elapsed = time.perf_counter() - start
+    return size[0] * size[1] * images / elapsed, 'pixels/s'
+
+
+def bench_compile_table(count, repeats=1):
+    """
+    One-off compile of the final mask table for 'count' undesired colors. Returns tables/s.
+    """
+    from color_engine import FINAL_CLASS, compile_color_table, mask_table
+
+    undesired_colors = synthetic_undesired_colors(count)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        mask_table(compile_color_table(HSV_LOWER, HSV_UPPER, undesired_colors), FINAL_CLASS)
+    elapsed = time.perf_counter() - start
+    return repeats / elapsed, 'tables/s'
+
+
+def bench_undesired_mask(count, size=(640, 360), repeats=20):
+    """
+    Build final masks with the color table of 'count' undesired colors. Returns pixels/s of the
+    per-frame mask stage; the one-off compile is timed by bench_compile_table.
+    """
+    from color_engine import FINAL_CLASS, compile_color_table, lookup, mask_table
+
+    hsv_frame = cv2.cvtColor(synthetic_image(*size, 'high'), cv2.COLOR_BGR2HSV)
+    final_table = mask_table(compile_color_table(HSV_LOWER, HSV_UPPER, synthetic_undesired_colors(count)), FINAL_CLASS)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        lookup(final_table, hsv_frame)
+    elapsed = time.perf_counter() - start
+    return size[0] * size[1] * repeats / elapsed, 'pixels/s'
+
+
+def bench_bgr_mask(count, size=(640, 360), repeats=20):
+    """
+    Desired and final masks of a frame from the direct BGR table (one gather, no cvtColor).
+    Fails if the masks differ from the HSV pipeline. Returns pixels/s, excluding the one-off
+    table build.
+    """
+    from bgr_engine import class_mask, classify_bgr, compile_bgr_table, range_table
+    from color_engine import FINAL_CLASS, compile_color_table, lookup, mask_table
+
+    final_table = mask_table(compile_color_table(HSV_LOWER, HSV_UPPER, synthetic_undesired_colors(count)), FINAL_CLASS)
+    bgr_table = compile_bgr_table([range_table(HSV_LOWER, HSV_UPPER), final_table])
+    frame = synthetic_image(*size, 'high')
+
+    hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    classes = classify_bgr(bgr_table, frame)
+    if not (np.array_equal(class_mask(classes, 0), cv2.inRange(hsv_frame, HSV_LOWER, HSV_UPPER)) and
+            np.array_equal(class_mask(classes, 1), lookup(final_table, hsv_frame))):
+        raise AssertionError("BGR table masks differ from the HSV pipeline")
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        classes = classify_bgr(bgr_table, frame)
+        class_mask(classes, 0)
+        class_mask(classes, 1)
+    elapsed = time.perf_counter() - start
+    return size[0] * size[1] * repeats / elapsed, 'pixels/s'
+
+
+def bench_video(frames):
+    """
+    Headless pipelined video loop of Test_aimbot_Video over a generated video. Returns frames/s.
+    """
+    from color_engine import FINAL_CLASS, compile_color_table, mask_table
+    from Test_aimbot_Video import FrameProcessor, open_video, run_headless
+
+    final_table = mask_table(compile_color_table(HSV_LOWER, HSV_UPPER, synthetic_undesired_colors(1000)),
+                             FINAL_CLASS)
+    with tempfile.TemporaryDirectory() as folder:
+        video_path = os.path.join(folder, 'input.mp4')
+        synthetic_video(video_path, frames, VIDEO_SIZE)
+        cap, out = open_video(video_path, os.path.join(folder, 'processed_video.mp4'))
+        try:
+            start = time.perf_counter()
+            stages, _ = run_headless(cap, out, FrameProcessor(HSV_LOWER, HSV_UPPER, final_table))
+            elapsed = time.perf_counter() - start
+        finally:
+            cap.release()
+            out.release()
+    return stages[-1].frames / elapsed, 'frames/s'
+
+
+def _run_case(name, args):
+    """
+    Worker entry point: run one benchmark in a fresh process so its peak RSS is its own.
+    """
+    # Keep the progress output of the benchmarked code out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        throughput, unit = BENCHMARKS[name](*args)
+    return throughput, unit, _peak_rss_mb()
+
+
+BENCHMARKS = {'extract': bench_extract, 'compile_table': bench_compile_table, 'undesired_mask': bench_undesired_mask,
+              'bgr_mask': bench_bgr_mask, 'video': bench_video}
+
+
+def benchmark_cases(profile):
+    """
+    Return the (case name, benchmark, args) list of a profile.
+    """
+    cases = []
+    for size in IMAGE_SIZES[profile]:
+        for diversity in ('low', 'high'):
+            cases.append((f'extract/{size[0]}x{size[1]}/{diversity}', 'extract', (size, diversity)))
+    for count in UNDESIRED_COUNTS[profile]:
+        cases.append((f'compile_table/{count}', 'compile_table', (count,)))
+        cases.append((f'undesired_mask/{count}', 'undesired_mask', (count,)))
+    cases.append(('bgr_mask/1000', 'bgr_mask', (1000,)))
+    cases.append((f'video/{VIDEO_SIZE[0]}x{VIDEO_SIZE[1]}/{VIDEO_FRAMES[profile]}', 'video', (VIDEO_FRAMES[profile],)))
+    return cases
+
+
+def run_benchmarks(profile, selected=None):
+    """
+    Run every case of a profile (optionally only names starting with one of 'selected').
+    Returns {case: {'throughput', 'unit', 'peak_rss_mb'}}.
+    """
+    results = {}
+    context = get_context('spawn')
+    for case, name, args in benchmark_cases(profile):
+        if selected and not any(case.startswith(prefix) for prefix in selected):
+            continue
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            throughput, unit, peak_rss_mb = pool.submit(_run_case, name, args).result()
+        results[case] = {'throughput': throughput, 'unit': unit, 'peak_rss_mb': peak_rss_mb}
+        print(f"  {case:<32} {throughput:>14,.0f} {unit:<9} peak RSS {peak_rss_mb:8.1f} MB", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Return the list of regressions: throughput below, or peak RSS above, the baseline by more
+    than 'threshold' (relative).
+    """
+    regressions = []
+    for case, result in results.items():
+        reference = baseline.get(case)
+        if reference is None:
+            continue
+        if result['throughput'] < reference['throughput'] * (1 - threshold):
+            regressions.append(f"{case}: {result['throughput']:,.0f} {result['unit']} "
+                               f"< baseline {reference['throughput']:,.0f}")
+        if result['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{case}: peak RSS {result['peak_rss_mb']:.1f} MB "
+                               f"> baseline {reference['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the color extraction, mask and video stages "
+                                                 "on deterministic synthetic fixtures.")
+    parser.add_argument('--profile', choices=sorted(IMAGE_SIZES), default='quick',
+                        help="fixture sizes to run (default: quick)")
+    parser.add_argument('--only', nargs='+', help="run only the cases whose name starts with one of these prefixes")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=f"baseline JSON file (default: {DEFAULT_BASELINE})")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"relative regression that fails the run (default: {DEFAULT_THRESHOLD})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"Running '{args.profile}' benchmarks")
+    results = run_benchmarks(args.profile, args.only)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.save_baseline or not baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
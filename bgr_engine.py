@@ -0,0 +1,143 @@
+import hashlib
+import os
+
+import cv2
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from color_engine import HSV_CUBE_SHAPE, HSV_CUBE_SIZE, hsv_range_slices, lookup, pack_hsv
+
+# One entry per 24-bit color, indexed by the pixel's bytes read as a little-endian word:
+# key = b | g << 8 | r << 16
+BGR_TABLE_SIZE = 1 << 24
+DEFAULT_BGR_CACHE_DIR = os.path.join("Out_Put", "bgr_table_cache")
+
+
+def range_table(hsv_lower, hsv_upper):
+    """
+    Return a flat 0/255 HSV table of an inclusive HSV range (same rule as cv2.inRange).
+    """
+    table = np.zeros(HSV_CUBE_SHAPE, dtype=np.uint8)
+    table[hsv_range_slices(hsv_lower, hsv_upper)] = 255
+    return table.reshape(-1)
+
+
+def pack_bgr(frame, out=None):
+    """
+    Pack an (H, W, 3) uint8 BGR frame (any row stride) into a flat uint32 array of
+    b | g << 8 | r << 16 keys. Every pixel but the last of each row is read as one 32-bit word
+    that overlaps the next pixel and masked to 24 bits, which is much cheaper than shifting
+    and OR-ing the three channels.
+    """
+    if frame.strides[1:] != (3, 1):
+        frame = np.ascontiguousarray(frame)
+    height, width = frame.shape[:2]
+    if out is None:
+        out = np.empty(height * width, dtype=np.uint32)
+    keys = out.reshape(height, width)
+    words = as_strided(frame, shape=(height, width - 1, 4), strides=(frame.strides[0], 3, 1)).view('<u4')[..., 0]
+    np.bitwise_and(words, 0xFFFFFF, out=keys[:, :-1])
+    last = frame[:, -1].astype(np.uint32)
+    keys[:, -1] = last[:, 0] | last[:, 1] << 8 | last[:, 2] << 16
+    return out
+
+
+def all_bgr_colors():
+    """
+    Return every 24-bit BGR color once as a 4096x4096 BGR image; pixel i has key i.
+    """
+    keys = np.arange(BGR_TABLE_SIZE, dtype=np.uint32)
+    image = np.empty((BGR_TABLE_SIZE, 3), dtype=np.uint8)
+    image[:, 0] = keys & 0xFF
+    image[:, 1] = (keys >> 8) & 0xFF
+    image[:, 2] = keys >> 16
+    return image.reshape(4096, 4096, 3)
+
+
+def compile_bgr_table(hsv_tables):
+    """
+    Fold up to 8 flat 0/255 HSV mask tables into one BGR table: bit i of entry
+    (b | g << 8 | r << 16) is set when hsv_tables[i] is set for that color's HSV value.
+    The HSV values come from cv2.cvtColor itself, so the table reproduces it exactly.
+    """
+    if not 0 < len(hsv_tables) <= 8:
+        raise ValueError("between 1 and 8 HSV tables are supported")
+    hsv_colors = cv2.cvtColor(all_bgr_colors(), cv2.COLOR_BGR2HSV)
+    keys = pack_hsv(hsv_colors)
+    bgr_table = np.zeros(BGR_TABLE_SIZE, dtype=np.uint8)
+    for bit, table in enumerate(hsv_tables):
+        bgr_table |= (np.take(table, keys) & (1 << bit)).astype(np.uint8)
+    return bgr_table
+
+
+def bgr_table_digest(hsv_tables):
+    """
+    Cache key of the BGR table of these HSV tables; includes the OpenCV version, whose
+    color conversion the table reproduces.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(cv2.__version__.encode('utf-8'))
+    for table in hsv_tables:
+        if np.asarray(table).size != HSV_CUBE_SIZE:
+            raise ValueError("HSV tables must cover the whole HSV cube")
+        digest.update(np.ascontiguousarray(table, dtype=np.uint8).data)
+    return digest.hexdigest()
+
+
+def load_bgr_table(hsv_tables, cache_dir=DEFAULT_BGR_CACHE_DIR):
+    """
+    Return the BGR table of these HSV tables, from '<cache_dir>/<digest>.npy' when it was built
+    before (cache_dir None disables the cache).
+    """
+    if cache_dir is None:
+        return compile_bgr_table(hsv_tables)
+
+    cache_path = os.path.join(cache_dir, bgr_table_digest(hsv_tables) + '.npy')
+    try:
+        bgr_table = np.load(cache_path)
+        if bgr_table.shape == (BGR_TABLE_SIZE,) and bgr_table.dtype == np.uint8:
+            return bgr_table
+    except (FileNotFoundError, ValueError, OSError):
+        pass
+
+    bgr_table = compile_bgr_table(hsv_tables)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = cache_path + '.tmp.npy'
+    np.save(temp_path, bgr_table)
+    os.replace(temp_path, cache_path)
+    return bgr_table
+
+
+def classify_bgr(bgr_table, frame, out=None, keys=None):
+    """
+    Gather the class bits of every pixel of a BGR frame in one table lookup (no cvtColor).
+    'out' (contiguous, frame-shaped uint8) and 'keys' (uint32, one per pixel) are optional
+    preallocated buffers as in color_engine.lookup.
+    """
+    keys = pack_bgr(frame, out=keys)
+    if out is None:
+        return bgr_table[keys].reshape(frame.shape[:2])
+    np.take(bgr_table, keys, out=out.reshape(-1))
+    return out
+
+
+def class_mask(classes, bit, out=None):
+    """
+    Return the 0/255 mask of one class bit of a classify_bgr result.
+    """
+    mask_lut = np.where(np.arange(256) & (1 << bit), 255, 0).astype(np.uint8)
+    return cv2.LUT(classes, mask_lut, dst=out)
+
+
+def verify_bgr_table(bgr_table, hsv_tables):
+    """
+    Check the BGR table against the HSV pipeline (cvtColor + HSV table lookup) for all 16.7M
+    BGR colors. Returns the number of mismatching table entries (0 = equivalent).
+    """
+    image = all_bgr_colors()
+    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    classes = classify_bgr(bgr_table, image)
+    mismatches = np.zeros(classes.shape, dtype=np.bool_)
+    for bit, table in enumerate(hsv_tables):
+        mismatches |= class_mask(classes, bit) != lookup(table, hsv_image)
+    return int(np.count_nonzero(mismatches))
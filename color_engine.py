@@ -0,0 +1,214 @@
+import numpy as np
+
+# OpenCV stores 8-bit HSV as H in 0-179 and S, V in 0-255, so a pixel packs into
+# a 24-bit key (h << 16 | s << 8 | v) and the whole color space is 180*256*256 keys.
+HSV_HUE_BINS = 180
+HSV_CUBE_SHAPE = (HSV_HUE_BINS, 256, 256)
+HSV_CUBE_SIZE = HSV_HUE_BINS * 256 * 256
+
+
+def pack_hsv(hsv_pixels, out=None):
+    """
+    Pack an (..., 3) uint8 HSV array into a flat uint32 array of 24-bit color keys.
+    'out' is an optional preallocated uint32 array to pack into without allocating.
+    """
+    pixels = np.asarray(hsv_pixels, dtype=np.uint8).reshape(-1, 3)
+    if out is None:
+        out = np.empty(pixels.shape[0], dtype=np.uint32)
+    out[:] = pixels[:, 0]
+    out <<= 8
+    out |= pixels[:, 1]
+    out <<= 8
+    out |= pixels[:, 2]
+    return out
+
+
+def unpack_hsv(keys):
+    """
+    Unpack 24-bit color keys back into an (N, 3) array of [h, s, v] rows.
+    """
+    keys = np.asarray(keys, dtype=np.uint32)
+    return np.stack(((keys >> 16) & 0xFF, (keys >> 8) & 0xFF, keys & 0xFF), axis=1).astype(np.int32)
+
+
+def hsv_histogram(hsv_image):
+    """
+    Count the pixels of every HSV color in an image as a flat histogram over the HSV cube.
+    """
+    return np.bincount(pack_hsv(hsv_image), minlength=HSV_CUBE_SIZE)
+
+
+def sparse_histogram(hsv_image):
+    """
+    Return the compact histogram of an image: sorted uint32 color keys and their uint32 pixel counts.
+    Sorts the packed keys instead of counting over the whole cube, so the working memory scales
+    with the pixel count (which main.py's memory budget relies on).
+    """
+    keys = np.sort(pack_hsv(hsv_image))
+    if keys.size == 0:
+        return keys, np.zeros(0, dtype=np.uint32)
+    starts = np.flatnonzero(np.diff(keys)) + 1
+    bounds = np.concatenate(([0], starts, [keys.size]))
+    return keys[bounds[:-1]], np.diff(bounds).astype(np.uint32)
+
+
+def mark_colors(occupancy, hsv_image):
+    """
+    Set the occupancy bitmap entry of every color present in the image.
+    """
+    occupancy[pack_hsv(hsv_image)] = True
+    return occupancy
+
+
+def new_occupancy():
+    """
+    Return an empty occupancy bitmap (one bool per HSV color).
+    """
+    return np.zeros(HSV_CUBE_SIZE, dtype=np.bool_)
+
+
+def hsv_range_slices(hsv_lower, hsv_upper):
+    """
+    Return the (h, s, v) slices that select an inclusive HSV range from the 3D HSV cube.
+    """
+    return tuple(slice(max(0, int(lo)), max(0, int(hi) + 1)) for lo, hi in zip(hsv_lower, hsv_upper))
+
+
+def count_in_range(occupancy, hsv_lower, hsv_upper):
+    """
+    Return (desired, total) color counts of an occupancy bitmap or histogram for an HSV range.
+    """
+    cube = occupancy.reshape(HSV_CUBE_SHAPE)
+    desired = int(np.count_nonzero(cube[hsv_range_slices(hsv_lower, hsv_upper)]))
+    return desired, int(np.count_nonzero(occupancy))
+
+
+def keys_in_range(keys, hsv_lower, hsv_upper):
+    """
+    Vectorized inclusive range test of packed color keys, same rule as cv2.inRange.
+    """
+    keys = np.asarray(keys, dtype=np.uint32)
+    h = keys >> 16
+    s = (keys >> 8) & 0xFF
+    v = keys & 0xFF
+    return ((h >= hsv_lower[0]) & (h <= hsv_upper[0]) &
+            (s >= hsv_lower[1]) & (s <= hsv_upper[1]) &
+            (v >= hsv_lower[2]) & (v <= hsv_upper[2]))
+
+
+def split_colors(occupancy, hsv_lower, hsv_upper):
+    """
+    Split an occupancy bitmap (or histogram) into sorted desired and undesired color key arrays.
+    """
+    keys = np.flatnonzero(occupancy).astype(np.uint32)
+    inside = keys_in_range(keys, hsv_lower, hsv_upper)
+    return keys[inside], keys[~inside]
+
+
+# Class bits stored in a compiled color table
+DESIRED_CLASS = 1
+UNDESIRED_CLASS = 2
+FINAL_CLASS = 4
+
+
+def _dilate_box(cube, radius):
+    """
+    Grow every set cell of a bool cube into a (2*radius+1)^3 box, one axis at a time.
+    """
+    for axis in range(cube.ndim):
+        grown = cube.copy()
+        length = cube.shape[axis]
+        for shift in range(1, radius + 1):
+            if shift >= length:
+                break
+            src = [slice(None)] * cube.ndim
+            dst = [slice(None)] * cube.ndim
+            src[axis], dst[axis] = slice(0, length - shift), slice(shift, length)
+            grown[tuple(dst)] |= cube[tuple(src)]
+            grown[tuple(src)] |= cube[tuple(dst)]
+        cube = grown
+    return cube
+
+
+def undesired_cube(undesired_colors, tolerance=5):
+    """
+    Return a bool HSV cube marking every color within +-tolerance of an undesired color.
+    Equivalent to OR-ing cv2.inRange(color - tolerance, color + tolerance) over the list.
+    'undesired_colors' is a list of [h, s, v] colors or an occupancy bitmap.
+    """
+    # Pad the cube so colors just outside the valid range still reach into it
+    padded = np.zeros(tuple(n + 2 * tolerance for n in HSV_CUBE_SHAPE), dtype=np.bool_)
+    core = tuple(slice(tolerance, tolerance + n) for n in HSV_CUBE_SHAPE)
+    colors = np.asarray(undesired_colors)
+    if colors.dtype == np.bool_ and colors.size == HSV_CUBE_SIZE:
+        padded[core] = colors.reshape(HSV_CUBE_SHAPE)
+    else:
+        colors = colors.astype(np.int64).reshape(-1, 3) + tolerance
+        inside = np.all((colors >= 0) & (colors < np.array(padded.shape)), axis=1)
+        colors = colors[inside]
+        padded[colors[:, 0], colors[:, 1], colors[:, 2]] = True
+    return _dilate_box(padded, tolerance)[core]
+
+
+def compile_color_table(hsv_lower, hsv_upper, undesired_colors, tolerance=5):
+    """
+    Compile the desired range and undesired color list into one flat uint8 table of class bits
+    indexed by packed HSV key, so classifying a frame is a single gather per pixel.
+    """
+    table = np.zeros(HSV_CUBE_SHAPE, dtype=np.uint8)
+    table[hsv_range_slices(hsv_lower, hsv_upper)] |= DESIRED_CLASS
+    table[undesired_cube(undesired_colors, tolerance)] |= UNDESIRED_CLASS
+    table[table == DESIRED_CLASS] |= FINAL_CLASS
+    return table.reshape(-1)
+
+
+def mask_table(color_table, color_class):
+    """
+    Return a flat 0/255 uint8 table that maps a packed HSV key straight to a mask value.
+    """
+    return np.where(color_table & color_class, 255, 0).astype(np.uint8)
+
+
+def lookup(table, hsv_image, out=None, keys=None):
+    """
+    Gather a per-pixel table value for an HSV image, keeping its height and width.
+    'out' (contiguous, image-shaped) and 'keys' (uint32, one per pixel) are optional
+    preallocated buffers for allocation-free use in frame loops.
+    """
+    keys = pack_hsv(hsv_image, out=keys)
+    if out is None:
+        return table[keys].reshape(hsv_image.shape[:2])
+    np.take(table, keys, out=out.reshape(-1))
+    return out
+
+
+class SummedVolume:
+    """
+    3D prefix-sum (summed-volume table) over an HSV occupancy bitmap or histogram.
+    Answers the sum over any inclusive HSV box in O(1), vectorized over many boxes at once.
+    """
+
+    def __init__(self, volume):
+        volume = np.asarray(volume).reshape(HSV_CUBE_SHAPE)
+        total = int(volume.sum(dtype=np.int64))
+        dtype = np.int32 if total < 2 ** 31 else np.int64
+        self.table = np.zeros(tuple(n + 1 for n in HSV_CUBE_SHAPE), dtype=dtype)
+        self.table[1:, 1:, 1:] = volume
+        for axis in range(3):
+            np.cumsum(self.table, axis=axis, dtype=dtype, out=self.table)
+        self.total = total
+
+    def box_sum(self, lower, upper):
+        """
+        Sum of the volume inside inclusive [lower, upper] boxes; lower/upper are (..., 3) arrays.
+        """
+        limits = np.array(HSV_CUBE_SHAPE)
+        lo = np.clip(np.asarray(lower, dtype=np.int64), 0, limits)
+        hi = np.clip(np.asarray(upper, dtype=np.int64) + 1, 0, limits)
+        hi = np.maximum(hi, lo)  # empty boxes sum to zero
+        t = self.table
+        h0, s0, v0 = lo[..., 0], lo[..., 1], lo[..., 2]
+        h1, s1, v1 = hi[..., 0], hi[..., 1], hi[..., 2]
+        total = (t[h1, s1, v1].astype(np.int64) - t[h0, s1, v1] - t[h1, s0, v1] - t[h1, s1, v0]
+                 + t[h0, s0, v1] + t[h0, s1, v0] + t[h1, s0, v0] - t[h0, s0, v0])
+        return total
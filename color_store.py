@@ -0,0 +1,167 @@
+import os
+import re
+
+import numpy as np
+
+from color_engine import HSV_CUBE_SHAPE, HSV_CUBE_SIZE, new_occupancy, unpack_hsv
+
+# Binary color-set file: a 16-byte header followed by the payload
+#   magic (8 bytes) | encoding (uint32 LE) | color count (uint32 LE)
+COLOR_SET_MAGIC = b'HSVSET01'
+COLOR_SET_EXTENSION = '.hsvset'
+ENCODING_KEYS = 1    # sorted little-endian uint32 packed HSV keys
+ENCODING_BITSET = 2  # one bit per HSV color over the whole cube (np.packbits order)
+ENCODING_HISTOGRAM = 3  # sorted uint32 packed keys followed by their uint32 pixel counts
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('encoding', '<u4'), ('count', '<u4')])
+BITSET_BYTES = HSV_CUBE_SIZE // 8
+
+_LEGACY_COLOR = re.compile(r'\[(-?\d+),(-?\d+),(-?\d+)\]')
+
+
+def _as_keys(colors):
+    """
+    Return sorted packed keys for an occupancy bitmap or an array of packed keys.
+    """
+    colors = np.asarray(colors)
+    if colors.dtype == np.bool_:
+        return np.flatnonzero(colors).astype(np.uint32)
+    return np.unique(colors.astype(np.uint32))
+
+
+def write_color_set(path, colors):
+    """
+    Write a color set (occupancy bitmap or packed keys) in the binary format.
+    The smaller of the sorted-key and full-cube bitset encodings is chosen automatically.
+    """
+    keys = _as_keys(colors)
+    encoding = ENCODING_KEYS if keys.size * 4 < BITSET_BYTES else ENCODING_BITSET
+    header = np.array([(COLOR_SET_MAGIC, encoding, keys.size)], dtype=HEADER_DTYPE)
+
+    with open(path, 'wb') as f:
+        f.write(header.tobytes())
+        if encoding == ENCODING_KEYS:
+            f.write(keys.astype('<u4').tobytes())
+        else:
+            occupancy = new_occupancy()
+            occupancy[keys] = True
+            f.write(np.packbits(occupancy).tobytes())
+
+
+def write_histogram(path, keys, counts):
+    """
+    Write a compact color histogram (sorted packed keys and their pixel counts) in the binary format.
+    """
+    keys = np.asarray(keys, dtype='<u4')
+    header = np.array([(COLOR_SET_MAGIC, ENCODING_HISTOGRAM, keys.size)], dtype=HEADER_DTYPE)
+    with open(path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(keys.tobytes())
+        f.write(np.asarray(counts, dtype='<u4').tobytes())
+
+
+def read_histogram(path):
+    """
+    Read a histogram written by write_histogram and return (keys, counts) as uint32 arrays.
+    """
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if header.size == 0 or header[0]['magic'] != COLOR_SET_MAGIC or header[0]['encoding'] != ENCODING_HISTOGRAM:
+        raise ValueError(f"{path} is not a color histogram file")
+    count = int(header[0]['count'])
+    data = np.fromfile(path, dtype='<u4', count=2 * count, offset=HEADER_DTYPE.itemsize)
+    if data.size != 2 * count:
+        raise ValueError(f"Truncated color histogram file {path}")
+    return data[:count].astype(np.uint32), data[count:].astype(np.uint32)
+
+
+def is_color_set_file(path):
+    """
+    Return True if the file starts with the binary color-set magic.
+    """
+    with open(path, 'rb') as f:
+        return f.read(len(COLOR_SET_MAGIC)) == COLOR_SET_MAGIC
+
+
+def _read_binary(path):
+    """
+    Memory-map a binary color-set file and return its occupancy bitmap.
+    """
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)[0]
+    encoding, count = int(header['encoding']), int(header['count'])
+    occupancy = new_occupancy()
+
+    if encoding == ENCODING_KEYS:
+        if count:
+            occupancy[np.memmap(path, dtype='<u4', mode='r', offset=HEADER_DTYPE.itemsize, shape=(count,))] = True
+    elif encoding == ENCODING_HISTOGRAM:
+        keys, _ = read_histogram(path)
+        occupancy[keys] = True
+    elif encoding == ENCODING_BITSET:
+        bits = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_DTYPE.itemsize, shape=(BITSET_BYTES,))
+        occupancy[:] = np.unpackbits(bits).view(np.bool_)
+    else:
+        raise ValueError(f"Unknown color-set encoding {encoding} in {path}")
+    return occupancy
+
+
+def _read_text(path, label):
+    """
+    Parse a legacy '<label>: [h,s,v];[h,s,v];...' text file into an occupancy bitmap.
+    Colors that fall outside the OpenCV HSV range are ignored.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith(f"{label}:"):
+                break
+        else:
+            raise ValueError(f"No '{label}:' line found in {path}")
+
+    colors = np.array(_LEGACY_COLOR.findall(line), dtype=np.int64).reshape(-1, 3)
+    colors = colors[np.all((colors >= 0) & (colors < np.array(HSV_CUBE_SHAPE)), axis=1)]
+    occupancy = new_occupancy()
+    occupancy.reshape(HSV_CUBE_SHAPE)[colors[:, 0], colors[:, 1], colors[:, 2]] = True
+    return occupancy
+
+
+def read_color_set(path, label='Undesired colors'):
+    """
+    Load a color set as an occupancy bitmap from either the binary format or a legacy text file.
+    'label' selects the line to parse in legacy text files and is ignored for binary files.
+    """
+    if is_color_set_file(path):
+        return _read_binary(path)
+    return _read_text(path, label)
+
+
+def format_color_list(colors):
+    """
+    Format packed keys (or an occupancy bitmap) as the legacy '[h,s,v];...' text.
+    """
+    return ';'.join([f'[{h},{s},{v}]' for (h, s, v) in unpack_hsv(_as_keys(colors)).tolist()])
+
+
+def write_color_text(path, sections, footer_lines=()):
+    """
+    Write color sets in the legacy text format, one '<label>: [h,s,v];...;' line per section.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for label, colors in sections:
+            f.write(f"{label}: {format_color_list(colors)};\n")
+        for line in footer_lines:
+            f.write(f"{line}\n")
+
+
+def color_set_path(path):
+    """
+    Return the binary color-set path that sits next to a legacy text path.
+    """
+    return os.path.splitext(path)[0] + COLOR_SET_EXTENSION
+
+
+def existing_color_set_path(path):
+    """
+    Return path, or the binary color-set next to it when only that one exists.
+    """
+    binary_path = color_set_path(path)
+    if not os.path.exists(path) and os.path.exists(binary_path):
+        return binary_path
+    return path
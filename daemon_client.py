@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# Only the standard library is imported here: the client must start in milliseconds
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Out_Put", "analysis_daemon.sock")
+
+
+def send_request(request, socket_path=DEFAULT_SOCKET, timeout=None):
+    """
+    Send one request to the analysis daemon and return its decoded JSON response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with client.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("the daemon closed the connection without a response")
+    return json.loads(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Thin client of analysis_daemon.py.")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help=f"daemon socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument('--timeout', type=float, help="seconds to wait for the response (default: no limit)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    mask = commands.add_parser('mask-image', help="mask one image and write its 2x2 result composite")
+    mask.add_argument('path')
+    mask.add_argument('--output', help="composite PNG path (default: Out_Put/result_<name>.png)")
+
+    video = commands.add_parser('video-stats', help="compute the accuracy/tracking statistics of a video")
+    video.add_argument('path')
+    video.add_argument('--stats', help="also write the per-frame statistics to this CSV file")
+
+    folder = commands.add_parser('analyze-folder', help="run the main.py color analysis over a folder")
+    folder.add_argument('path')
+    folder.add_argument('--output', help="folder for the filtered images (default: F)")
+
+    for command in ('status', 'reload', 'shutdown'):
+        commands.add_parser(command)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    request = {'command': args.command.replace('-', '_')}
+    for option in ('path', 'output', 'stats'):
+        value = getattr(args, option, None)
+        if value is not None:
+            # The daemon runs in its own working directory
+            request[option] = os.path.abspath(value)
+
+    try:
+        response = send_request(request, args.socket, args.timeout)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No analysis daemon is listening on {args.socket} (start it with: python analysis_daemon.py)",
+              file=sys.stderr)
+        return 2
+    print(json.dumps(response, indent=2))
+    return 0 if response.get('ok') else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    """
+    Context manager that records one timed span of a named stage.
+    """
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class FrameProfiler:
+    """
+    Lightweight per-stage timer for the frame pipelines.
+
+    Wrap each named stage in 'with profiler.stage(name):'. A disabled profiler hands out one
+    shared no-op context, so the hooks cost a method call when profiling is off. An enabled
+    profiler keeps the last 'window' durations of every stage for rolling p50/p95/p99 figures
+    and up to 'max_events' spans for a Chrome-trace/Perfetto timeline.
+    """
+
+    def __init__(self, enabled=True, window=1000, max_events=1_000_000):
+        self.enabled = enabled
+        self.window = window
+        self.max_events = max_events
+        self.durations = {}
+        self.totals = {}
+        self.events = []
+        self.dropped_events = 0
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, start, duration):
+        """
+        Record one span of 'duration' seconds that started at perf_counter() time 'start'.
+        """
+        with self._lock:
+            durations = self.durations.get(name)
+            if durations is None:
+                durations = self.durations[name] = deque(maxlen=self.window)
+                self.totals[name] = [0, 0.0]
+            durations.append(duration)
+            total = self.totals[name]
+            total[0] += 1
+            total[1] += duration
+            if len(self.events) < self.max_events:
+                self.events.append((name, start, duration, threading.get_ident()))
+            else:
+                self.dropped_events += 1
+
+    def summary(self):
+        """
+        Return {stage: {count, total_ms, mean_ms, p50_ms, p95_ms, p99_ms}}; percentiles cover
+        the rolling window, count and total the whole run.
+        """
+        with self._lock:
+            snapshot = {name: (np.array(durations), tuple(self.totals[name]))
+                        for name, durations in self.durations.items()}
+
+        summary = {}
+        for name, (durations, (count, total)) in snapshot.items():
+            p50, p95, p99 = np.percentile(durations, [50, 95, 99]) * 1000
+            summary[name] = {'count': count, 'total_ms': total * 1000, 'mean_ms': total / count * 1000,
+                             'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+        return summary
+
+    def chrome_trace(self):
+        """
+        Return the recorded spans as a Chrome-trace ('traceEvents') dictionary.
+        """
+        with self._lock:
+            events = list(self.events)
+        thread_ids = {}
+        trace_events = []
+        for name, start, duration, thread in events:
+            tid = thread_ids.setdefault(thread, len(thread_ids))
+            trace_events.append({'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+                                 'ts': (start - self._origin) * 1e6, 'dur': duration * 1e6})
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export(self, prefix):
+        """
+        Write '<prefix>.summary.json' and '<prefix>.trace.json'; returns the two paths.
+        """
+        folder = os.path.dirname(prefix)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        summary_path, trace_path = f"{prefix}.summary.json", f"{prefix}.trace.json"
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump({'stages': self.summary(), 'dropped_events': self.dropped_events}, f, indent=2)
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+        return summary_path, trace_path
+
+    def print_summary(self):
+        """
+        Print one line of rolling statistics per stage.
+        """
+        for name, stats in self.summary().items():
+            print(f"  {name:<16} n={stats['count']:<7} mean {stats['mean_ms']:8.3f} ms  p50 {stats['p50_ms']:8.3f}"
+                  f"  p95 {stats['p95_ms']:8.3f}  p99 {stats['p99_ms']:8.3f}")
+
+
+NULL_PROFILER = FrameProfiler(enabled=False)
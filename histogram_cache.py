@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import time
+
+from color_store import read_histogram, write_histogram
+
+HISTOGRAM_EXTENSION = '.hist'
+INDEX_FILENAME = 'index.json'
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """
+    Return the BLAKE2b content hash of a file as a hex string.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HistogramCache:
+    """
+    Persistent per-image HSV histogram cache.
+
+    Histograms are stored as binary '<content hash>.hist' files (see color_store.write_histogram).
+    index.json maps each image path to its size, mtime and content hash, so unchanged files are
+    recognised from a stat() alone and touched-but-identical files from their content hash.
+    It also records a key of the inputs each image's filtered output was written from.
+    Entries are evicted least recently used first once the cache exceeds max_bytes, and when
+    they have not been used for max_age_days.
+    """
+
+    def __init__(self, cache_dir, max_bytes=None, max_age_days=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _histogram_path(self, digest):
+        return os.path.join(self.cache_dir, digest + HISTOGRAM_EXTENSION)
+
+    def get(self, file_path):
+        """
+        Return the cached (keys, counts) histogram of an image, or None if it must be decoded.
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        entry = self._index.get(file_path)
+
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            # New or modified file: identical content may still be cached under its hash
+            digest = file_digest(file_path)
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+
+        histogram_path = self._histogram_path(entry['hash'])
+        try:
+            histogram = read_histogram(histogram_path)
+        except (FileNotFoundError, ValueError):
+            self._pending[file_path] = entry
+            self.misses += 1
+            return None
+
+        entry['last_used'] = time.time()
+        self._index[file_path] = entry
+        self.hits += 1
+        return histogram
+
+    def put(self, file_path, keys, counts):
+        """
+        Store the histogram of an image that was decoded after a cache miss.
+        """
+        file_path = os.path.abspath(file_path)
+        entry = self._pending.pop(file_path, None)
+        if entry is None:
+            stat = os.stat(file_path)
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': file_digest(file_path)}
+
+        histogram_path = self._histogram_path(entry['hash'])
+        temp_path = histogram_path + '.tmp'
+        write_histogram(temp_path, keys, counts)
+        os.replace(temp_path, histogram_path)
+        entry['last_used'] = time.time()
+        self._index[file_path] = entry
+
+    def content_hash(self, file_path):
+        """
+        Return the content hash of an image looked up with get(), or None.
+        """
+        file_path = os.path.abspath(file_path)
+        # A miss leaves the file's previous index entry in place until put(); its new hash is pending
+        entry = self._pending.get(file_path) or self._index.get(file_path)
+        return entry['hash'] if entry is not None else None
+
+    def filtered_key(self, file_path):
+        """
+        Return the key recorded when the image's filtered output was last written, or None.
+        """
+        entry = self._index.get(os.path.abspath(file_path))
+        return entry.get('filtered_key') if entry is not None else None
+
+    def set_filtered_key(self, file_path, key):
+        """
+        Record the key of the inputs the filtered output of a cached image was written from.
+        """
+        entry = self._index.get(os.path.abspath(file_path))
+        if entry is not None:
+            entry['filtered_key'] = key
+
+    def clear(self):
+        """
+        Drop every cached histogram (used by --rebuild-cache).
+        """
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(HISTOGRAM_EXTENSION) or filename == INDEX_FILENAME:
+                os.remove(os.path.join(self.cache_dir, filename))
+        self._index = {}
+        self._pending = {}
+
+    def evict(self):
+        """
+        Remove entries older than max_age_days, then least recently used entries until the
+        cache fits in max_bytes. Returns the number of histogram files removed.
+        """
+        now = time.time()
+        last_used = {}
+        for file_path, entry in list(self._index.items()):
+            if self.max_age_days is not None and now - entry.get('last_used', 0) > self.max_age_days * 86400:
+                del self._index[file_path]
+                continue
+            last_used[entry['hash']] = max(last_used.get(entry['hash'], 0), entry.get('last_used', 0))
+
+        sizes = {}
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(HISTOGRAM_EXTENSION):
+                sizes[filename[:-len(HISTOGRAM_EXTENSION)]] = os.path.getsize(os.path.join(self.cache_dir, filename))
+
+        # Histograms no index entry refers to any more go first, then the least recently used
+        keep = sorted((digest for digest in sizes if digest in last_used), key=last_used.get, reverse=True)
+        total = 0
+        kept = set()
+        for digest in keep:
+            if self.max_bytes is not None and total + sizes[digest] > self.max_bytes:
+                break
+            total += sizes[digest]
+            kept.add(digest)
+
+        removed = 0
+        for digest in sizes:
+            if digest not in kept:
+                os.remove(self._histogram_path(digest))
+                removed += 1
+        self._index = {path: entry for path, entry in self._index.items() if entry['hash'] in kept}
+        return removed
+
+    def save(self):
+        """
+        Apply eviction and write the index back to disk.
+        """
+        self.evict()
+        temp_path = self._index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self._index_path)
@@ -1,14 +1,35 @@
+import argparse
 import configparser
+import hashlib
 import os
+import time
 import cv2
 import numpy as np
-import random
-from collections import Counter
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from colorama import Fore, init, Style
 
+from color_engine import HSV_CUBE_SIZE, count_in_range, new_occupancy, sparse_histogram, split_colors
+from color_store import color_set_path, write_color_set, write_color_text
+from frame_profiler import NULL_PROFILER, FrameProfiler
+from histogram_cache import HistogramCache
+from sampling import RatioEstimate, reservoir_sample, stratified_pixels
+from strip_io import image_strips
+
 # Set up colorama for console output
 init(autoreset=True)
 
+DEFAULT_CACHE_DIR = os.path.join("Out_Put", "histogram_cache")
+DEFAULT_MEMORY_BUDGET_MB = 1024
+# Peak working memory of analyze_image per pixel, on top of the decoded image
+# (HSV copy, mask, packed and sorted keys, histogram run boundaries, filtered output)
+ANALYSIS_BYTES_PER_PIXEL = 40
+# The strip path sums strip histograms into one dense uint32 histogram over the HSV cube. Its
+# fixed size is reserved out of the budget, so budgets below MIN_MEMORY_BUDGET_MB are rejected
+DENSE_HISTOGRAM_BYTES = HSV_CUBE_SIZE * 4
+MIN_MEMORY_BUDGET_MB = 64
+
 def load_config(config_file='config.ini'):
     """
     Load HSV lower and upper values from a config file, or create a new one with default values.
@@ -32,63 +53,267 @@ def load_config(config_file='config.ini'):
     
     return hsv_lower, hsv_upper
 
-def extract_unique_colors(folder_path, hsv_lower, hsv_upper, output_folder):
+def list_images(folder_path):
     """
-    Extract unique 'desired' and 'undesired' colors from images in the specified folder.
-    Saves the filtered 'desired' images to the output folder.
+    Return the paths of the image files in the folder, in directory order.
     """
     ftypes = [".jpg", ".JPG", ".JPEG", ".png", ".PNG", ".gif", ".GIF"]
-    unique_desired = set()
-    unique_undesired = set()
-
-    # Create output folder if it does not exist
-    os.makedirs(output_folder, exist_ok=True)
-    
+    image_paths = []
     for filename in os.listdir(folder_path):
         if not any(filename.endswith(ext) for ext in ftypes):
             continue
 
         file_path = os.path.join(folder_path, filename)
-        if not os.path.isfile(file_path):
-            continue
+        if os.path.isfile(file_path):
+            image_paths.append(file_path)
+    return image_paths
 
+def analyze_image(file_path, hsv_lower, hsv_upper, profiler=NULL_PROFILER, memory_budget=None, histogram=True):
+    """
+    Decode one image and return its filtered 'desired' image and compact color histogram
+    (sorted packed keys, pixel counts), or None if the image cannot be read.
+    With histogram=False only the filtered image is computed and keys/counts are None.
+    Images whose working memory would exceed memory_budget bytes are analyzed in horizontal
+    strips with identical results; their filtered image reuses the decoded image buffer, and
+    DENSE_HISTOGRAM_BYTES of the budget go to the histogram the strips are summed into.
+    Runs in worker processes when main() is started with --workers.
+    """
+    with profiler.stage('imread'):
         image = cv2.imread(file_path)
-        if image is None:
-            continue
-
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv_image, np.array(hsv_lower), np.array(hsv_upper))
-
-        # Extract pixel colors within the HSV range
-        pixels = hsv_image.reshape(-1, 3)
-        for pixel in pixels:
-            h, s, v = pixel
-            if hsv_lower[0] <= h <= hsv_upper[0] and \
-               hsv_lower[1] <= s <= hsv_upper[1] and \
-               hsv_lower[2] <= v <= hsv_upper[2]:
-                unique_desired.add((int(h), int(s), int(v)))
-            else:
-                unique_undesired.add((int(h), int(s), int(v)))
-
-        # Save filtered 'desired' image with added accuracy text
-        desired_image = cv2.bitwise_and(image, image, mask=mask)
+    if image is None:
+        return None
+
+    height, width = image.shape[:2]
+    if memory_budget is None or height * width * ANALYSIS_BYTES_PER_PIXEL <= memory_budget:
+        with profiler.stage('cvtColor'):
+            hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        with profiler.stage('inRange'):
+            mask = cv2.inRange(hsv_image, np.array(hsv_lower), np.array(hsv_upper))
+        keys = counts = None
+        if histogram:
+            with profiler.stage('histogram'):
+                keys, counts = sparse_histogram(hsv_image)
+        with profiler.stage('bitwise_and'):
+            desired_image = cv2.bitwise_and(image, image, mask=mask)
+        return desired_image, keys, counts
+
+    # Strip histograms are summed into one dense histogram, whose size is fixed by the HSV cube
+    dense = None
+    strip_budget = memory_budget
+    if histogram:
+        dense = np.zeros(HSV_CUBE_SIZE, dtype=np.uint32)
+        strip_budget = max(memory_budget - DENSE_HISTOGRAM_BYTES, 0)
+    for start, stop in image_strips(height, width, strip_budget, ANALYSIS_BYTES_PER_PIXEL):
+        strip = image[start:stop]
+        with profiler.stage('cvtColor'):
+            hsv_strip = cv2.cvtColor(strip, cv2.COLOR_BGR2HSV)
+        with profiler.stage('inRange'):
+            mask = cv2.inRange(hsv_strip, np.array(hsv_lower), np.array(hsv_upper))
+        if histogram:
+            with profiler.stage('histogram'):
+                strip_keys, strip_counts = sparse_histogram(hsv_strip)
+                dense[strip_keys] += strip_counts  # keys are unique within a strip
+        with profiler.stage('bitwise_and'):
+            # The strip is fully analyzed, so its filtered pixels can replace the decoded ones
+            strip[...] = cv2.bitwise_and(strip, strip, mask=mask)
+    if not histogram:
+        return image, None, None
+    keys = np.flatnonzero(dense).astype(np.uint32)
+    return image, keys, dense[keys]
+
+def _analyze_task(task, **kwargs):
+    # Module-level wrapper so worker processes can unpickle the (file_path, histogram) task
+    return analyze_image(task[0], histogram=task[1], **kwargs)
+
+def _ordered_results(executor, fn, items, window):
+    """
+    Yield fn(item) results in input order while keeping at most 'window' tasks in flight.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def report_progress(done, total, start_time):
+    """
+    Print a one-line progress/throughput status that is overwritten in place.
+    """
+    elapsed = time.perf_counter() - start_time
+    rate = done / elapsed if elapsed > 0 else 0.0
+    end = "\n" if done == total else ""
+    print(f"\r  Processed {done}/{total} images ({rate:.1f} images/s)", end=end, flush=True)
 
-        # Add accuracy text to the image
-        add_accuracy_text_to_image(desired_image, unique_desired, unique_undesired)
+def extract_unique_colors(folder_path, hsv_lower, hsv_upper, output_folder, workers=1, cache=None,
+                          profiler=NULL_PROFILER, memory_budget=None):
+    """
+    Extract unique 'desired' and 'undesired' colors from images in the specified folder.
+    Saves the filtered 'desired' images to the output folder.
+    Colors are returned as sorted arrays of packed 24-bit HSV keys (see color_engine).
+    With workers > 1 the images are decoded and analyzed in a process pool; results are
+    merged in folder order, so the output is identical to a serial run.
+    With a HistogramCache, unchanged images are taken from the cache without decoding. Their
+    filtered images are only decoded and rewritten when missing or stale: the accuracy text of
+    each image counts the colors of every image up to it, so an image's output is keyed by the
+    HSV range and the content hashes of all images up to and including it, in folder order.
+    Stages are timed with 'profiler'; in worker processes only the parent-side stages are.
+    memory_budget (bytes, per process) bounds the working memory of each image analysis.
+    """
+    image_paths = list_images(folder_path)
+    occupancy = new_occupancy()
+
+    output_paths = [os.path.join(output_folder, f"filtered_desired_{os.path.basename(path)}") for path in image_paths]
+
+    # Cached histograms need no decoding; only the remaining images go to the analysis, plus
+    # cached images whose filtered output is missing or was written from other inputs
+    cached = [cache.get(path) if cache is not None else None for path in image_paths]
+    filter_keys = [None] * len(image_paths)
+    if cache is not None:
+        chain = hashlib.blake2b(repr((list(map(int, hsv_lower)), list(map(int, hsv_upper)))).encode('utf-8'),
+                                digest_size=20)
+        for index, path in enumerate(image_paths):
+            chain.update(cache.content_hash(path).encode('ascii'))
+            filter_keys[index] = chain.hexdigest()
+    refilter = [histogram is not None and (cache.filtered_key(path) != filter_key or not os.path.exists(output_path))
+                for path, histogram, filter_key, output_path in zip(image_paths, cached, filter_keys, output_paths)]
+    tasks = [(path, histogram is None) for path, histogram, stale in zip(image_paths, cached, refilter)
+             if histogram is None or stale]
 
-        output_path = os.path.join(output_folder, f"filtered_desired_{filename}")
-        cv2.imwrite(output_path, desired_image)
+    # Create output folder if it does not exist
+    os.makedirs(output_folder, exist_ok=True)
 
-    return unique_desired, unique_undesired
+    # The profiler holds a lock and cannot be sent to worker processes, which use their default one
+    analyze = partial(_analyze_task, hsv_lower=hsv_lower, hsv_upper=hsv_upper, memory_budget=memory_budget)
+    if workers <= 1:
+        analyze = partial(analyze, profiler=profiler)
+    start_time = time.perf_counter()
+
+    def write_image(output_path, image):
+        with profiler.stage('imwrite'):
+            return cv2.imwrite(output_path, image)
+
+    # PNG encoding and disk writes run on a background thread, overlapping with the analysis
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        writes = []
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = _ordered_results(pool, analyze, tasks, workers * 2)
+        else:
+            pool = None
+            results = map(analyze, tasks)
+
+        try:
+            for done, (file_path, histogram, stale, filter_key, output_path) in enumerate(
+                    zip(image_paths, cached, refilter, filter_keys, output_paths), start=1):
+                if histogram is None:
+                    result = next(results)
+                    if result is not None and cache is not None:
+                        cache.put(file_path, result[1], result[2])
+                elif stale:
+                    result = next(results)
+                    if result is not None:
+                        result = (result[0],) + histogram
+                else:
+                    result = (None,) + histogram
+                report_progress(done, len(image_paths), start_time)
+                if result is None:
+                    continue
+                desired_image, keys, _ = result
+
+                # Merge the image histogram into the occupancy bitmap
+                with profiler.stage('merge'):
+                    occupancy[keys] = True
+                    if desired_image is None:
+                        continue
+                    total_desired, total_unique = count_in_range(occupancy, hsv_lower, hsv_upper)
+
+                # Add accuracy text to the image
+                with profiler.stage('putText'):
+                    add_accuracy_text_to_image(desired_image, total_desired, total_unique - total_desired)
+
+                writes.append((file_path, filter_key, writer.submit(write_image, output_path, desired_image)))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        for file_path, filter_key, write in writes:
+            if write.result() and cache is not None:
+                cache.set_filtered_key(file_path, filter_key)
+
+    return split_colors(occupancy, hsv_lower, hsv_upper)
+
+def sample_image(file_path, hsv_lower, hsv_upper, sample_pixels, seed):
+    """
+    Decode one image and classify a stratified sample of its pixels.
+    Returns (pixel_count, sample_size, desired_in_sample), or None if the image cannot be read.
+    """
+    image = cv2.imread(file_path)
+    if image is None:
+        return None
+    pixels = stratified_pixels(image, sample_pixels, np.random.default_rng(seed))
+    # Only the sampled pixels are converted, as a one-column image
+    hsv_pixels = cv2.cvtColor(pixels.reshape(-1, 1, 3), cv2.COLOR_BGR2HSV)
+    desired = cv2.countNonZero(cv2.inRange(hsv_pixels, np.array(hsv_lower), np.array(hsv_upper)))
+    return image.shape[0] * image.shape[1], pixels.shape[0], desired
+
+def _sample_task(task, hsv_lower, hsv_upper, sample_pixels):
+    # Module-level wrapper so worker processes can unpickle the task
+    return sample_image(task[0], hsv_lower, hsv_upper, sample_pixels, task[1])
+
+def estimate_accuracy(folder_path, hsv_lower, hsv_upper, tolerance=0.005, confidence=0.95, sample_pixels=4096,
+                      min_images=10, workers=1, seed=None):
+    """
+    Estimate the share of desired pixels in the folder from a random order of its images and
+    a stratified pixel sample of each, stopping once the confidence interval half-width is
+    within 'tolerance' (as a fraction) after at least 'min_images' images.
+    Returns a sampling.RatioEstimate.
+    """
+    rng = np.random.default_rng(seed)
+    image_paths = list_images(folder_path)
+    order = rng.permutation(len(image_paths))
+    # One seed per image keeps the estimate reproducible for a given --seed, serial or not
+    image_seeds = rng.integers(0, 2**63, size=len(image_paths))
+    tasks = [(image_paths[index], image_seeds[index]) for index in order]
+
+    sample = partial(_sample_task, hsv_lower=hsv_lower, hsv_upper=hsv_upper, sample_pixels=sample_pixels)
+    estimate = RatioEstimate(len(image_paths), confidence)
+    start_time = time.perf_counter()
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = _ordered_results(pool, sample, tasks, workers * 2)
+    else:
+        pool = None
+        results = map(sample, tasks)
+
+    try:
+        for done, result in enumerate(results, start=1):
+            report_progress(done, len(tasks), start_time)
+            if result is not None:
+                estimate.add(*result)
+            if estimate.images >= min_images and estimate.half_width() <= tolerance:
+                if done < len(tasks):
+                    print()  # end the progress line
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return estimate
+
+def sample_colors(colors, count, rng=None, chunk_size=1 << 16):
+    """
+    Draw 'count' colors uniformly without replacement by streaming over the array in chunks.
+    """
+    chunks = (colors[start:start + chunk_size] for start in range(0, len(colors), chunk_size))
+    return np.sort(reservoir_sample(chunks, count, rng))
 
-def add_accuracy_text_to_image(image, unique_desired, unique_undesired):
+def add_accuracy_text_to_image(image, total_desired, total_undesired):
     """
     Add accuracy text on the image with the accuracy percentage.
     The text size and position are adjusted dynamically based on the image size.
     """
     # Calculate the accuracy (simulated)
-    total_desired = len(unique_desired)
-    total_undesired = len(unique_undesired)
     total_unique = total_desired + total_undesired
     simulated_accuracy = (total_desired / total_unique * 100) if total_unique > 0 else 0
 
@@ -112,17 +337,97 @@ def add_accuracy_text_to_image(image, unique_desired, unique_undesired):
     # Draw text on the image
     cv2.putText(image, accuracy_text, (text_x, text_y), font, font_scale, (255, 255, 255), 2)
 
-def save_required_undesired_colors(undesired_colors, output_dir):
+def save_required_undesired_colors(undesired_colors, output_dir, write_text=False):
     """
-    Save the required undesired colors based on the calculated accuracy into a text file.
+    Save the required undesired colors based on the calculated accuracy into a binary color-set file
+    (and the legacy text file when write_text is set). Returns the saved paths.
     """
     required_undesired_output_path = os.path.join(output_dir, "required_undesired_colors.txt")
-    with open(required_undesired_output_path, "w", encoding="utf-8") as f:
-        f.write(f"Undesired colors: {';'.join([f'[{h},{s},{v}]' for (h, s, v) in undesired_colors])};\n")
+    saved_paths = [color_set_path(required_undesired_output_path)]
+    write_color_set(saved_paths[0], undesired_colors)
+    if write_text:
+        write_color_text(required_undesired_output_path, [("Undesired colors", undesired_colors)])
+        saved_paths.append(required_undesired_output_path)
 
-    print(Fore.GREEN + f"Required undesired colors saved to: {required_undesired_output_path}" + Style.RESET_ALL)
+    for path in saved_paths:
+        print(Fore.GREEN + f"Required undesired colors saved to: {path}" + Style.RESET_ALL)
+    return saved_paths
+
+def report_estimate(folder_path, hsv_lower, hsv_upper, output_dir, args):
+    """
+    Run the sampling-based estimate of main() --approximate, print it and save it to
+    accuracy_estimate.txt.
+    """
+    estimate = estimate_accuracy(folder_path, hsv_lower, hsv_upper, args.tolerance / 100, args.confidence,
+                                 args.sample_pixels, args.min_images, args.workers, args.seed)
+    share = estimate.share()
+    lower, upper = estimate.interval()
+
+    def ratio(value):
+        return value / (1 - value) if value < 1 else float('inf')
+
+    lines = [f"Images sampled: {estimate.images} of {estimate.population}",
+             f"Pixels sampled: {estimate.sampled_pixels}",
+             f"Desired pixel share: {share * 100:.2f}% "
+             f"({args.confidence * 100:g}% CI {lower * 100:.2f}% - {upper * 100:.2f}%)",
+             f"Desired/undesired pixel ratio: {ratio(share):.4f} "
+             f"({args.confidence * 100:g}% CI {ratio(lower):.4f} - {ratio(upper):.4f})"]
+
+    print(Fore.GREEN + "\nApproximate Color Analysis Results:" + Style.RESET_ALL)
+    for line in lines:
+        print(f"  {line}")
+
+    estimate_output_path = os.path.join(output_dir, "accuracy_estimate.txt")
+    with open(estimate_output_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print(Fore.GREEN + f"\nEstimate saved to: {estimate_output_path}" + Style.RESET_ALL)
+
+def parse_args(argv=None):
+    """
+    Parse the command line options of the color analysis.
+    """
+    parser = argparse.ArgumentParser(description="Analyze desired/undesired HSV colors of the images in M/.")
+    parser.add_argument('--text-colors', action='store_true',
+                        help="also write the legacy bracketed text color files next to the binary .hsvset files")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes used to analyze the images (default: 1, serial)")
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help="time every per-image stage and write PREFIX.summary.json and a PREFIX.trace.json "
+                             "Chrome-trace/Perfetto timeline")
+    parser.add_argument('--cache-dir', nargs='?', const=DEFAULT_CACHE_DIR,
+                        help=f"reuse per-image HSV histograms cached in this directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help="discard the histogram cache before the analysis (implies --cache-dir)")
+    parser.add_argument('--cache-max-mb', type=float,
+                        help="evict least recently used histograms when the cache exceeds this size")
+    parser.add_argument('--cache-max-age-days', type=float,
+                        help="evict histograms that have not been used for this many days")
+    parser.add_argument('--memory-budget-mb', type=float, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="analyze images whose working memory would exceed this budget (per process, besides "
+                             f"the decoded image) in horizontal strips; at least {MIN_MEMORY_BUDGET_MB}, as the strips "
+                             f"share a fixed {DENSE_HISTOGRAM_BYTES / 2**20:.0f} MB histogram "
+                             f"(default: {DEFAULT_MEMORY_BUDGET_MB})")
+    parser.add_argument('--approximate', action='store_true',
+                        help="only estimate the desired pixel share from sampled images and pixels, "
+                             "with a confidence interval (no color files are written)")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="--approximate stops once the confidence interval half-width is within this many "
+                             "percentage points (default: 0.5)")
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help="confidence level of the --approximate interval (default: 0.95)")
+    parser.add_argument('--sample-pixels', type=int, default=4096,
+                        help="pixels sampled per image in --approximate mode (default: 4096)")
+    parser.add_argument('--min-images', type=int, default=10,
+                        help="images sampled before --approximate may stop early (default: 10)")
+    parser.add_argument('--seed', type=int, help="random seed of the image, pixel and undesired color sampling")
+    args = parser.parse_args(argv)
+    if args.memory_budget_mb < MIN_MEMORY_BUDGET_MB:
+        parser.error(f"--memory-budget-mb must be at least {MIN_MEMORY_BUDGET_MB}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
 
-def main():
     # Get the directory of the current script
     script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -138,14 +443,37 @@ def main():
     hsv_lower, hsv_upper = load_config()
     print(Fore.CYAN + f"Loaded HSV values from config.ini:\n  HSV_Custom_Lower = {hsv_lower}\n  HSV_Custom_Upper = {hsv_upper}" + Style.RESET_ALL)
 
+    if args.approximate:
+        return report_estimate(folder_path, hsv_lower, hsv_upper, output_dir, args)
+
     # Input the target accuracy for the Aimbot
     target_accuracy = int(input(Fore.YELLOW + "Enter the target accuracy for Aimbot (0-100): " + Style.RESET_ALL))
 
-    # Extract unique colors and calculate accuracy
-    unique_desired, unique_undesired = extract_unique_colors(folder_path, hsv_lower, hsv_upper, output_folder)
+    profiler = FrameProfiler() if args.profile else NULL_PROFILER
+
+    # Open the histogram cache, if enabled
+    cache = None
+    if args.cache_dir or args.rebuild_cache:
+        cache_dir = os.path.join(script_dir, args.cache_dir or DEFAULT_CACHE_DIR)
+        max_bytes = int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb is not None else None
+        cache = HistogramCache(cache_dir, max_bytes, args.cache_max_age_days)
+        if args.rebuild_cache:
+            cache.clear()
 
-    total_desired = len(unique_desired)
-    total_undesired = len(unique_undesired)
+    # Extract unique colors and calculate accuracy
+    unique_desired, unique_undesired = extract_unique_colors(folder_path, hsv_lower, hsv_upper, output_folder,
+                                                             workers=args.workers, cache=cache, profiler=profiler,
+                                                             memory_budget=int(args.memory_budget_mb * 1024 * 1024))
+    if cache is not None:
+        cache.save()
+        print(Fore.CYAN + f"Histogram cache: {cache.hits} reused, {cache.misses} decoded ({cache.cache_dir})" + Style.RESET_ALL)
+    if profiler.enabled:
+        profiler.print_summary()
+        for path in profiler.export(os.path.join(script_dir, args.profile)):
+            print(Fore.CYAN + f"Stage timings saved to: {path}" + Style.RESET_ALL)
+
+    total_desired = unique_desired.size
+    total_undesired = unique_undesired.size
     total_unique = total_desired + total_undesired
 
     simulated_accuracy = (total_desired / total_unique * 100) if total_unique > 0 else 0
@@ -160,10 +488,15 @@ def main():
 
     # Save results to files
     hsv_colors_output_path = os.path.join(output_dir, "hsv_colors_output.txt")
-    with open(hsv_colors_output_path, "w", encoding="utf-8") as f:
-        f.write(f"Undesired colors: {';'.join([f'[{h},{s},{v}]' for (h, s, v) in unique_undesired])};\n")
-        f.write(f"Desired colors: {';'.join([f'[{h},{s},{v}]' for (h, s, v) in unique_desired])};\n")
-        f.write(f"Total unique colors: {total_unique}\n")
+    color_output_paths = [os.path.join(output_dir, "hsv_colors_undesired.hsvset"),
+                          os.path.join(output_dir, "hsv_colors_desired.hsvset")]
+    write_color_set(color_output_paths[0], unique_undesired)
+    write_color_set(color_output_paths[1], unique_desired)
+    if args.text_colors:
+        write_color_text(hsv_colors_output_path,
+                         [("Undesired colors", unique_undesired), ("Desired colors", unique_desired)],
+                         [f"Total unique colors: {total_unique}"])
+        color_output_paths.append(hsv_colors_output_path)
 
     accuracy_output_path = os.path.join(output_dir, "accuracy_output.txt")
     with open(accuracy_output_path, "w", encoding="utf-8") as f:
@@ -175,15 +508,17 @@ def main():
 
     # Save required undesired colors based on the calculated amount
     required_count = int(round(required_undesired))
-    sampled_undesired = random.sample(list(unique_undesired), required_count) if total_undesired >= required_count and required_count > 0 else list(unique_undesired)
+    if total_undesired >= required_count and required_count > 0:
+        sampled_undesired = sample_colors(unique_undesired, required_count, np.random.default_rng(args.seed))
+    else:
+        sampled_undesired = unique_undesired
 
-    save_required_undesired_colors(sampled_undesired, output_dir)
+    required_output_paths = save_required_undesired_colors(sampled_undesired, output_dir, args.text_colors)
 
     # Filter images based on selected or file-provided undesired colors
     print(Fore.GREEN + "\nResults saved in files:" + Style.RESET_ALL)
-    print(f"  {hsv_colors_output_path}")
-    print(f"  {accuracy_output_path}")
-    print(f"  {os.path.join(output_dir, 'required_undesired_colors.txt')}")
+    for path in color_output_paths + [accuracy_output_path] + required_output_paths:
+        print(f"  {path}")
 
 if __name__ == '__main__':
     main()
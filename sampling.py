@@ -0,0 +1,110 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+
+def reservoir_sample(chunks, k, rng=None):
+    """
+    Draw k items uniformly without replacement from a stream of 1-D array chunks, keeping at
+    most k items (plus one chunk) in memory. Returns all items if the stream has fewer than k.
+    Every item gets a uniform random priority and the k smallest priorities are kept.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    reservoir = None
+    priorities = np.empty(0)
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        if chunk.size == 0:
+            continue
+        reservoir = chunk if reservoir is None else np.concatenate((reservoir, chunk))
+        priorities = np.concatenate((priorities, rng.random(chunk.size)))
+        if reservoir.size > k:
+            keep = np.argpartition(priorities, k - 1)[:k] if k > 0 else np.empty(0, dtype=np.intp)
+            reservoir, priorities = reservoir[keep], priorities[keep]
+    if reservoir is None:
+        return np.empty(0)
+    return reservoir[np.argsort(priorities)]
+
+
+def stratified_pixels(image, count, rng=None):
+    """
+    Return about 'count' pixels of an image as an (N, 3) array, one random pixel from every
+    cell of a regular grid (jittered sampling), so every region of the image is represented.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    height, width = image.shape[:2]
+    if count >= height * width:
+        return image.reshape(-1, image.shape[2])
+    rows = max(1, min(height, round(math.sqrt(count * height / width))))
+    cols = max(1, min(width, count // rows))
+    y = ((np.arange(rows)[:, None] + rng.random((rows, cols))) * (height / rows)).astype(np.intp)
+    x = ((np.arange(cols)[None, :] + rng.random((rows, cols))) * (width / cols)).astype(np.intp)
+    return image[y.ravel(), x.ravel()]
+
+
+class RatioEstimate:
+    """
+    Two-stage (images, then pixels) estimate of the share of desired pixels in a folder.
+
+    Each sampled image contributes its pixel count x and the desired pixel count y estimated
+    from its pixel sample; the folder share is the pixel-weighted ratio estimator, and its
+    confidence interval comes from the between-image variance with a finite population
+    correction for the images. Only running sums of x, y, x^2, y^2 and xy are kept, so adding
+    an image and updating the interval are O(1).
+    """
+
+    def __init__(self, population, confidence=0.95):
+        self.population = population
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.confidence = confidence
+        self.images = 0
+        self.sampled_pixels = 0
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xx = 0.0
+        self.sum_yy = 0.0
+        self.sum_xy = 0.0
+
+    def add(self, pixel_count, sample_size, desired_in_sample):
+        x = float(pixel_count)
+        y = x * desired_in_sample / sample_size if sample_size else 0.0
+        self.images += 1
+        self.sampled_pixels += sample_size
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xx += x * x
+        self.sum_yy += y * y
+        self.sum_xy += x * y
+
+    def share(self):
+        return self.sum_y / self.sum_x if self.sum_x else 0.0
+
+    def half_width(self):
+        """
+        Half-width of the confidence interval of share(); infinite with fewer than two images.
+        """
+        count = self.images
+        if count < 2:
+            return math.inf
+        share = self.share()
+        if count >= self.population:
+            # Every image is in the sample: only the pixel sampling is left, which the
+            # between-image term no longer covers, so fall back to the binomial error
+            return self.z * math.sqrt(max(share * (1 - share), 0.0) / max(self.sampled_pixels, 1))
+        if not self.sum_x:
+            return 0.0
+        # Sample variance of the residuals y - share * x, expanded in the running sums
+        residual_sum = self.sum_y - share * self.sum_x
+        residual_squares = self.sum_yy - 2 * share * self.sum_xy + share * share * self.sum_xx
+        residual_variance = max(residual_squares - residual_sum * residual_sum / count, 0.0) / (count - 1)
+        mean_x = self.sum_x / count
+        variance = (1 - count / self.population) * residual_variance / (count * mean_x * mean_x)
+        return self.z * math.sqrt(variance)
+
+    def interval(self):
+        """
+        Return the (lower, upper) confidence bounds of share(), clipped to [0, 1].
+        """
+        share, half_width = self.share(), self.half_width()
+        return max(0.0, share - half_width), min(1.0, share + half_width)
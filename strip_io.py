@@ -0,0 +1,96 @@
+import struct
+import zlib
+
+import numpy as np
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+IDAT_CHUNK_SIZE = 1 << 20  # compressed bytes per IDAT chunk
+_FILTER_UP = 2  # PNG row filter: difference to the row above
+
+
+def image_strips(height, width, memory_budget, bytes_per_pixel):
+    """
+    Return the (start, stop) row ranges of the horizontal strips an image is processed in so
+    that each strip's working memory (bytes_per_pixel per pixel) stays within memory_budget bytes.
+    """
+    rows = max(1, int(memory_budget // (width * bytes_per_pixel)))
+    return [(start, min(start + rows, height)) for start in range(0, height, rows)]
+
+
+def _chunk(chunk_type, data):
+    return (struct.pack('>I', len(data)) + chunk_type + data +
+            struct.pack('>I', zlib.crc32(chunk_type + data) & 0xFFFFFFFF))
+
+
+class PngStripWriter:
+    """
+    Write an 8-bit BGR (or grayscale) PNG one horizontal strip at a time, so an image far larger
+    than memory can be encoded from strips that are computed on the fly. Rows are stored with the
+    PNG 'Up' filter, which is vectorized over a whole strip. Use as a context manager; the file
+    is complete once close() ran and exactly 'height' rows were written.
+    """
+
+    def __init__(self, path, width, height, channels=3, compression=1):
+        if channels not in (1, 3):
+            raise ValueError(f"unsupported channel count: {channels}")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows_written = 0
+        self._previous_row = np.zeros((1, width * channels), dtype=np.uint8)
+        self._compressor = zlib.compressobj(compression)
+        self._pending = bytearray()
+        self._file = open(path, 'wb')
+        color_type = 2 if channels == 3 else 0
+        self._file.write(PNG_SIGNATURE)
+        self._file.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._file.close()  # leave the original error alone; the partial file is not valid
+        else:
+            self.close()
+        return False
+
+    def _flush(self, final=False):
+        while len(self._pending) >= IDAT_CHUNK_SIZE or (final and self._pending):
+            self._file.write(_chunk(b'IDAT', bytes(self._pending[:IDAT_CHUNK_SIZE])))
+            del self._pending[:IDAT_CHUNK_SIZE]
+
+    def write(self, strip):
+        """
+        Append the next rows: an (rows, width, 3) BGR or (rows, width) grayscale uint8 array.
+        """
+        rows = strip.shape[0]
+        if self.rows_written + rows > self.height:
+            raise ValueError("more rows than the image height")
+        if self.channels == 3:
+            strip = strip[..., ::-1]  # PNG stores RGB
+        rows_data = np.ascontiguousarray(strip, dtype=np.uint8).reshape(rows, self.width * self.channels)
+
+        filtered = np.empty((rows, rows_data.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = _FILTER_UP
+        np.subtract(rows_data[:1], self._previous_row, out=filtered[:1, 1:])
+        np.subtract(rows_data[1:], rows_data[:-1], out=filtered[1:, 1:])
+        self._previous_row = rows_data[-1:].copy()
+
+        self._pending += self._compressor.compress(filtered)
+        self._flush()
+        self.rows_written += rows
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            if self.rows_written == self.height:
+                self._pending += self._compressor.flush()
+                self._flush(final=True)
+                self._file.write(_chunk(b'IEND', b''))
+        finally:
+            self._file.close()
+        if self.rows_written != self.height:
+            raise ValueError(f"{self.path}: {self.rows_written} of {self.height} rows were written")
@@ -0,0 +1,164 @@
+import argparse
+import csv
+import os
+import time
+import numpy as np
+from colorama import Fore, init, Style
+
+from color_engine import HSV_CUBE_SHAPE, SummedVolume, new_occupancy
+from color_store import read_color_set
+from main import load_config
+
+# Set up colorama for console output
+init(autoreset=True)
+
+CSV_HEADER = ['rank', 'h_lower', 's_lower', 'v_lower', 'h_upper', 's_upper', 'v_upper',
+              'desired', 'undesired', 'accuracy']
+
+
+def parse_bounds(text, limit):
+    """
+    Parse a 'start:stop:step' option into the candidate bound values of one HSV channel. The stop
+    value (clamped to the channel maximum) is always a candidate, so 0:179:15 can reach hue 179.
+    """
+    parts = [int(x) for x in text.split(':')]
+    if len(parts) != 3 or parts[2] <= 0:
+        raise argparse.ArgumentTypeError(f"expected start:stop:step, got '{text}'")
+    start, stop, step = parts
+    start, stop = max(0, start), min(limit - 1, stop)
+    if start > stop:
+        raise argparse.ArgumentTypeError(f"'{text}' gives no values in 0-{limit - 1}")
+    return np.union1d(np.arange(start, stop + 1, step), [stop])
+
+
+def channel_pairs(values):
+    """
+    Return every (lower, upper) pair with lower <= upper as two arrays.
+    """
+    lower_index, upper_index = np.triu_indices(values.size)
+    return values[lower_index], values[upper_index]
+
+
+def load_occupancy(color_paths):
+    """
+    Merge the color sets written by main.py into one occupancy bitmap of all analyzed colors.
+    """
+    occupancy = new_occupancy()
+    for path in color_paths:
+        occupancy |= read_color_set(path)
+    return occupancy
+
+
+def _ranking(accuracy, desired, volume, target_accuracy):
+    """
+    Return the candidate order: closest to the target accuracy, then most desired colors, then
+    the smallest box.
+    """
+    return np.lexsort((volume, -desired, np.abs(accuracy - target_accuracy)))
+
+
+def sweep_ranges(summed_volume, h_values, s_values, v_values, target_accuracy, top=100, chunk_size=1 << 20):
+    """
+    Evaluate every HSV box built from the candidate bound values and return the 'top' best as
+    (lower, upper, desired, accuracy) arrays, plus the number of candidates evaluated.
+
+    A target accuracy is required: accuracy only grows as a box widens, so ranking by highest
+    accuracy alone would always pick the full 0-179/0-255/0-255 box.
+    """
+    pairs = [channel_pairs(values) for values in (h_values, s_values, v_values)]
+    shape = tuple(pair[0].size for pair in pairs)
+    candidates = int(np.prod(shape))
+    total = summed_volume.total
+
+    best = None
+    for start in range(0, candidates, chunk_size):
+        index = np.unravel_index(np.arange(start, min(start + chunk_size, candidates)), shape)
+        lower = np.stack([pair[0][i] for pair, i in zip(pairs, index)], axis=-1)
+        upper = np.stack([pair[1][i] for pair, i in zip(pairs, index)], axis=-1)
+
+        desired = summed_volume.box_sum(lower, upper)
+        accuracy = desired / total * 100 if total > 0 else np.zeros(desired.shape)
+        volume = np.prod(upper - lower + 1, axis=-1)
+
+        chunk = (lower, upper, desired, accuracy, volume)
+        if best is not None:
+            chunk = tuple(np.concatenate(pair) for pair in zip(best, chunk))
+        order = _ranking(chunk[3], chunk[2], chunk[4], target_accuracy)[:top]
+        best = tuple(column[order] for column in chunk)
+
+    return best[:4], candidates
+
+
+def write_sweep_csv(output_path, lower, upper, desired, accuracy, total):
+    """
+    Write the ranked candidate ranges to a CSV file.
+    """
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for rank, (lo, hi, d, acc) in enumerate(zip(lower.tolist(), upper.tolist(), desired.tolist(),
+                                                    accuracy.tolist()), start=1):
+            writer.writerow([rank, *lo, *hi, d, total - d, f'{acc:.4f}'])
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line options of the range sweep.
+    """
+    output_dir = "Out_Put"
+    parser = argparse.ArgumentParser(
+        description="Rank candidate HSV_Custom_Lower/Upper ranges against the colors found by main.py, "
+                    "without decoding any image.")
+    parser.add_argument('--colors', nargs='+',
+                        default=[os.path.join(output_dir, "hsv_colors_desired.hsvset"),
+                                 os.path.join(output_dir, "hsv_colors_undesired.hsvset")],
+                        help="color-set files whose union is the analyzed color space")
+    parser.add_argument('--h', type=lambda text: parse_bounds(text, HSV_CUBE_SHAPE[0]), default='0:179:15',
+                        help="hue bound candidates as start:stop:step (default: 0:179:15)")
+    parser.add_argument('--s', type=lambda text: parse_bounds(text, HSV_CUBE_SHAPE[1]), default='0:255:32',
+                        help="saturation bound candidates as start:stop:step (default: 0:255:32)")
+    parser.add_argument('--v', type=lambda text: parse_bounds(text, HSV_CUBE_SHAPE[2]), default='0:255:32',
+                        help="value bound candidates as start:stop:step (default: 0:255:32)")
+    parser.add_argument('--target-accuracy', type=float, required=True,
+                        help="rank by distance to this accuracy (0-100); required because the widest range "
+                             "always has the highest accuracy")
+    parser.add_argument('--top', type=int, default=100, help="number of ranked ranges to write (default: 100)")
+    parser.add_argument('--output', default=os.path.join(output_dir, "hsv_range_sweep.csv"),
+                        help="ranked CSV output path")
+    args = parser.parse_args(argv)
+    if not 0 <= args.target_accuracy <= 100:
+        parser.error("--target-accuracy must be between 0 and 100")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    color_paths = [os.path.join(script_dir, path) for path in args.colors]
+    output_path = os.path.join(script_dir, args.output)
+
+    start_time = time.perf_counter()
+    summed_volume = SummedVolume(load_occupancy(color_paths))
+    total = summed_volume.total
+    print(Fore.CYAN + f"Indexed {total} analyzed colors in {time.perf_counter() - start_time:.2f}s" + Style.RESET_ALL)
+
+    # Report the range currently configured in config.ini for reference
+    hsv_lower, hsv_upper = load_config(os.path.join(script_dir, 'config.ini'))
+    current = int(summed_volume.box_sum(hsv_lower, hsv_upper))
+    current_accuracy = (current / total * 100) if total > 0 else 0
+    print(f"  Current range {hsv_lower} - {hsv_upper}: {current} desired colors, accuracy {current_accuracy:.2f}%")
+
+    start_time = time.perf_counter()
+    (lower, upper, desired, accuracy), candidates = sweep_ranges(summed_volume, args.h, args.s, args.v,
+                                                                 args.target_accuracy, args.top)
+    elapsed = time.perf_counter() - start_time
+    write_sweep_csv(output_path, lower, upper, desired, accuracy, total)
+
+    print(Fore.GREEN + f"\nEvaluated {candidates} candidate ranges in {elapsed:.2f}s" + Style.RESET_ALL)
+    if desired.size:
+        print(f"  Best: {lower[0].tolist()} - {upper[0].tolist()} accuracy {accuracy[0]:.2f}%")
+    print(f"  Ranked ranges saved to: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
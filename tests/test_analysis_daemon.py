@@ -0,0 +1,43 @@
+import numpy as np
+
+from analysis_daemon import AnalysisState
+from benchmark import synthetic_video
+from color_store import write_color_set
+
+UNDESIRED_KEYS = np.array([30 << 16 | 230 << 8 | 230], dtype=np.uint32)
+
+
+def write_configs(folder, image_undesired, video_undesired):
+    video_path = folder / 'input.mp4'
+    synthetic_video(str(video_path), 2, (64, 48))
+    hsv_range = "[HSV_Values]\nHSV_Custom_Lower = 20,100,100\nHSV_Custom_Upper = 40,255,255\n"
+    image_config = folder / 'image.ini'
+    image_config.write_text(f"[Paths]\nundesired_colors_file_path = {image_undesired}\n" + hsv_range, encoding='utf-8')
+    video_config = folder / 'video.ini'
+    video_config.write_text(f"[Paths]\nvideo_path = {video_path}\nundesired_colors_file_path = {video_undesired}\n"
+                            + hsv_range, encoding='utf-8')
+    folder_config = folder / 'config.ini'
+    folder_config.write_text("[HSV]\nHSV_Custom_Lower = 20,100,100\nHSV_Custom_Upper = 40,255,255\n", encoding='utf-8')
+    return str(image_config), str(folder_config), str(video_config)
+
+
+def test_settings_follow_the_configured_undesired_files(tmp_path):
+    # Both configs name a legacy .txt path; only the .hsvset that main.py writes exists
+    write_color_set(str(tmp_path / 'image.hsvset'), UNDESIRED_KEYS)
+    write_color_set(str(tmp_path / 'video.hsvset'), UNDESIRED_KEYS)
+    state = AnalysisState(*write_configs(tmp_path, tmp_path / 'image.txt', tmp_path / 'video.txt'))
+
+    settings = state.current()
+    assert settings.undesired_count == 1
+    assert settings.video_undesired_path == str(tmp_path / 'video.txt')
+
+    # The .hsvset that is actually read is watched, so rewriting it reloads the settings
+    watched = [path for path, _ in state._watched_signature(settings)]
+    assert str(tmp_path / 'image.hsvset') in watched
+    assert str(tmp_path / 'video.hsvset') in watched
+
+def test_malformed_undesired_file_does_not_fail_the_reload(tmp_path):
+    (tmp_path / 'image.txt').write_text("not a color list\n", encoding='utf-8')
+    (tmp_path / 'video.txt').write_text("not a color list\n", encoding='utf-8')
+    state = AnalysisState(*write_configs(tmp_path, tmp_path / 'image.txt', tmp_path / 'video.txt'))
+    assert state.current().undesired_count == 0
@@ -0,0 +1,38 @@
+import json
+
+import benchmark
+
+
+def test_compare_flags_throughput_and_memory_regressions():
+    baseline = {'case': {'throughput': 100.0, 'unit': 'pixels/s', 'peak_rss_mb': 100.0}}
+    steady = {'case': {'throughput': 90.0, 'unit': 'pixels/s', 'peak_rss_mb': 110.0}}
+    slower = {'case': {'throughput': 50.0, 'unit': 'pixels/s', 'peak_rss_mb': 100.0}}
+    larger = {'case': {'throughput': 100.0, 'unit': 'pixels/s', 'peak_rss_mb': 200.0}}
+    new_case = {'other': {'throughput': 1.0, 'unit': 'pixels/s', 'peak_rss_mb': 1.0}}
+
+    assert benchmark.compare(steady, baseline, 0.25) == []
+    assert len(benchmark.compare(slower, baseline, 0.25)) == 1
+    assert len(benchmark.compare(larger, baseline, 0.25)) == 1
+    assert benchmark.compare(new_case, baseline, 0.25) == []
+
+
+def test_smoke_case_saves_and_checks_the_baseline(tmp_path):
+    baseline_path = tmp_path / 'baseline.json'
+    argv = ['--profile', 'smoke', '--only', 'undesired_mask', '--baseline', str(baseline_path)]
+
+    # The first run has no baseline to compare against and stores one
+    assert benchmark.main(argv) == 0
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+    assert list(baseline) == ['undesired_mask/10']
+    assert baseline['undesired_mask/10']['throughput'] > 0
+    assert baseline['undesired_mask/10']['unit'] == 'pixels/s'
+
+    # A baseline no run can reach is reported as a regression
+    baseline['undesired_mask/10']['throughput'] = float('inf')
+    baseline_path.write_text(json.dumps(baseline), encoding='utf-8')
+    assert benchmark.main(argv) == 1
+
+    # ...and one every run beats is not
+    baseline['undesired_mask/10'].update(throughput=0.0, peak_rss_mb=float('inf'))
+    baseline_path.write_text(json.dumps(baseline), encoding='utf-8')
+    assert benchmark.main(argv) == 0
@@ -0,0 +1,92 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import bgr_engine
+from bgr_engine import (bgr_table_digest, class_mask, classify_bgr, compile_bgr_table, load_bgr_table, pack_bgr,
+                        verify_bgr_table)
+from color_engine import DESIRED_CLASS, FINAL_CLASS, UNDESIRED_CLASS, compile_color_table, lookup, mask_table
+
+HSV_LOWER = np.array([20, 100, 100])
+HSV_UPPER = np.array([40, 255, 255])
+UNDESIRED_COLORS = np.array([[30, 200, 200], [0, 0, 0], [179, 255, 255], [25, 120, 250]])
+
+
+@pytest.fixture(scope='module')
+def hsv_tables():
+    color_table = compile_color_table(HSV_LOWER, HSV_UPPER, UNDESIRED_COLORS)
+    return [mask_table(color_table, color_class) for color_class in (DESIRED_CLASS, UNDESIRED_CLASS, FINAL_CLASS)]
+
+
+@pytest.fixture(scope='module')
+def bgr_table(hsv_tables):
+    return compile_bgr_table(hsv_tables)
+
+
+def edge_frame():
+    """
+    Corner, gray, primary and hue-wrap BGR colors plus the borders of the desired range.
+    """
+    levels = [0, 1, 127, 128, 254, 255]
+    colors = [(b, g, r) for b in levels for g in levels for r in levels]
+    hsv_edges = [(h, s, v) for h in (0, 19, 20, 40, 41, 179) for s in (0, 99, 100, 255) for v in (0, 99, 100, 255)]
+    colors += [tuple(int(c) for c in bgr) for bgr in
+               cv2.cvtColor(np.array([hsv_edges], dtype=np.uint8), cv2.COLOR_HSV2BGR)[0]]
+    return np.array(colors, dtype=np.uint8).reshape(1, -1, 3)
+
+
+def random_frame():
+    return np.random.default_rng(0).integers(0, 256, size=(97, 131, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize('frame', [edge_frame(), random_frame(), random_frame()[5:60, 7:90]],
+                         ids=['edges', 'random', 'random-view'])
+def test_masks_match_the_hsv_pipeline(frame, hsv_tables, bgr_table):
+    hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    classes = classify_bgr(bgr_table, frame)
+    for bit, table in enumerate(hsv_tables):
+        np.testing.assert_array_equal(class_mask(classes, bit), lookup(table, hsv_frame))
+    np.testing.assert_array_equal(class_mask(classes, 0), cv2.inRange(hsv_frame, HSV_LOWER, HSV_UPPER))
+
+
+def test_pack_bgr_reads_little_endian_words():
+    frame = random_frame()
+    expected = (frame[..., 0].astype(np.uint32) | frame[..., 1].astype(np.uint32) << 8 |
+                frame[..., 2].astype(np.uint32) << 16).reshape(-1)
+    np.testing.assert_array_equal(pack_bgr(frame), expected)
+
+
+def test_verify_bgr_table_counts_mismatches(hsv_tables, bgr_table):
+    assert verify_bgr_table(bgr_table, hsv_tables) == 0
+
+    corrupted = bgr_table.copy()
+    corrupted[[0, 12345, 2 ** 24 - 1]] ^= 0b101
+    assert verify_bgr_table(corrupted, hsv_tables) == 3
+
+
+def test_load_bgr_table_cache_is_keyed_by_tables_and_opencv(tmp_path, hsv_tables, bgr_table, monkeypatch):
+    cache_dir = str(tmp_path)
+    np.testing.assert_array_equal(load_bgr_table(hsv_tables, cache_dir), bgr_table)
+    cache_path = os.path.join(cache_dir, bgr_table_digest(hsv_tables) + '.npy')
+    assert os.listdir(cache_dir) == [os.path.basename(cache_path)]
+
+    # A cache hit does not rebuild the table
+    def no_rebuild(tables):
+        raise AssertionError("table rebuilt despite a valid cache entry")
+    monkeypatch.setattr(bgr_engine, 'compile_bgr_table', no_rebuild)
+    np.testing.assert_array_equal(load_bgr_table(hsv_tables, cache_dir), bgr_table)
+    monkeypatch.undo()
+
+    # Other tables or another OpenCV version get their own cache key
+    changed_tables = [hsv_tables[0], np.zeros_like(hsv_tables[1]), hsv_tables[0]]
+    assert bgr_table_digest(changed_tables) != bgr_table_digest(hsv_tables)
+    monkeypatch.setattr(cv2, '__version__', cv2.__version__ + '-other')
+    assert bgr_table_digest(hsv_tables) != os.path.basename(cache_path)[:-len('.npy')]
+    monkeypatch.undo()
+
+    # A damaged cache file is rebuilt instead of being used
+    np.save(cache_path, np.zeros(10, dtype=np.uint8))
+    np.testing.assert_array_equal(load_bgr_table(hsv_tables, cache_dir), bgr_table)
+    assert np.load(cache_path).shape == bgr_table.shape
@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+
+from color_engine import DESIRED_CLASS, FINAL_CLASS, UNDESIRED_CLASS, compile_color_table, lookup, mask_table
+from color_engine import new_occupancy, pack_hsv
+
+HSV_LOWER = np.array([20, 100, 100])
+HSV_UPPER = np.array([40, 255, 255])
+# Colors near the channel edges, where the +-5 box is clipped
+UNDESIRED_COLORS = np.array([[30, 200, 200], [0, 3, 250], [178, 120, 254], [25, 255, 100], [35, 101, 0]])
+
+
+def in_range_masks(hsv_image, undesired_colors):
+    # The per-color cv2.inRange loop the compiled tables replace
+    desired_color_mask = cv2.inRange(hsv_image, HSV_LOWER, HSV_UPPER)
+    undesired_mask_total = np.zeros_like(desired_color_mask)
+    for color in undesired_colors:
+        lower_bound = np.array([max(0, color[0] - 5), max(0, color[1] - 5), max(0, color[2] - 5)])
+        upper_bound = np.array([min(179, color[0] + 5), min(255, color[1] + 5), min(255, color[2] + 5)])
+        undesired_mask_total = cv2.bitwise_or(undesired_mask_total, cv2.inRange(hsv_image, lower_bound, upper_bound))
+    final_mask = cv2.bitwise_and(desired_color_mask, cv2.bitwise_not(undesired_mask_total))
+    return desired_color_mask, undesired_mask_total, final_mask
+
+
+def test_compiled_tables_match_the_in_range_loop():
+    rng = np.random.default_rng(0)
+    # Random pixels plus every undesired color with all offsets up to +-6 in each channel
+    hsv_image = np.stack([rng.integers(0, 180, 4096), rng.integers(0, 256, 4096), rng.integers(0, 256, 4096)], axis=1)
+    offsets = np.stack(np.meshgrid(*[np.arange(-6, 7)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+    around = (UNDESIRED_COLORS[:, None, :] + offsets).reshape(-1, 3)
+    around = np.clip(around, 0, [179, 255, 255])
+    hsv_image = np.concatenate([hsv_image, around]).astype(np.uint8).reshape(1, -1, 3)
+
+    expected = in_range_masks(hsv_image, UNDESIRED_COLORS)
+
+    # Both the color list and the occupancy bitmap main.py writes compile to the same tables
+    occupancy = new_occupancy()
+    occupancy[pack_hsv(UNDESIRED_COLORS.astype(np.uint8).reshape(1, -1, 3)).reshape(-1)] = True
+    for undesired_colors in (UNDESIRED_COLORS, occupancy):
+        color_table = compile_color_table(HSV_LOWER, HSV_UPPER, undesired_colors)
+        for color_class, expected_mask in zip((DESIRED_CLASS, UNDESIRED_CLASS, FINAL_CLASS), expected):
+            np.testing.assert_array_equal(lookup(mask_table(color_table, color_class), hsv_image), expected_mask)
@@ -0,0 +1,54 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from color_engine import DESIRED_CLASS, FINAL_CLASS, UNDESIRED_CLASS, compile_color_table, mask_table
+from Test_aimbot_image import STRIP_BYTES_PER_PIXEL, compose_result, process_image, process_image_tiled, run_batch
+
+SAMPLE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'M')
+
+
+def sample_tables():
+    color_table = compile_color_table([20, 100, 100], [40, 255, 255], np.array([[30, 200, 200]]))
+    return tuple(mask_table(color_table, color_class) for color_class in (DESIRED_CLASS, UNDESIRED_CLASS, FINAL_CLASS))
+
+
+def test_pooled_batch_matches_serial_batch(tmp_path):
+    # More images than the workers * 2 in-flight window
+    input_folder = tmp_path / 'in'
+    input_folder.mkdir()
+    sample_names = sorted(os.listdir(SAMPLE_FOLDER))
+    image_paths = []
+    for index in range(7):
+        image_path = str(input_folder / f'{index}.png')
+        shutil.copy(os.path.join(SAMPLE_FOLDER, sample_names[index % len(sample_names)]), image_path)
+        image_paths.append(image_path)
+
+    tables = sample_tables()
+    serial_rows = run_batch(image_paths, tables, str(tmp_path / 'serial'))
+    pooled_rows = run_batch(image_paths, tables, str(tmp_path / 'pooled'), workers=2)
+
+    assert [row[:1] + row[2:] for row in pooled_rows] == [row[:1] + row[2:] for row in serial_rows]
+    for (_, serial_output, *_), (_, pooled_output, *_) in zip(serial_rows, pooled_rows):
+        with open(serial_output, 'rb') as serial_file, open(pooled_output, 'rb') as pooled_file:
+            assert serial_file.read() == pooled_file.read()
+
+
+@pytest.mark.parametrize('height, width', [
+    (300, 200),  # strips on both halves
+    (37, 2000),  # shorter than the text, which spills into the bottom half
+])
+def test_tiled_image_matches_whole_image(tmp_path, height, width):
+    sample = cv2.imread(os.path.join(SAMPLE_FOLDER, sorted(os.listdir(SAMPLE_FOLDER))[0]))
+    frame = np.ascontiguousarray(np.resize(sample, (height, width, 3)))
+    tables = sample_tables()
+    output_path = str(tmp_path / 'tiled.png')
+
+    accuracy, tracking, _ = process_image_tiled(frame, tables, output_path, width * STRIP_BYTES_PER_PIXEL * 8)
+
+    result = process_image(frame, tables)
+    assert (accuracy, tracking) == tuple(result[4:])
+    np.testing.assert_array_equal(cv2.imread(output_path), compose_result(*result))
@@ -0,0 +1,79 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from histogram_cache import HistogramCache
+from main import ANALYSIS_BYTES_PER_PIXEL, DENSE_HISTOGRAM_BYTES, analyze_image, extract_unique_colors, list_images
+
+SAMPLE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'M')
+HSV_LOWER = [20, 100, 100]
+HSV_UPPER = [40, 255, 255]
+
+
+def test_worker_pool_matches_serial_run(tmp_path):
+    serial_folder = str(tmp_path / 'serial')
+    pool_folder = str(tmp_path / 'pool')
+
+    serial = extract_unique_colors(SAMPLE_FOLDER, HSV_LOWER, HSV_UPPER, serial_folder)
+    pooled = extract_unique_colors(SAMPLE_FOLDER, HSV_LOWER, HSV_UPPER, pool_folder, workers=2)
+
+    for serial_colors, pooled_colors in zip(serial, pooled):
+        np.testing.assert_array_equal(serial_colors, pooled_colors)
+    assert sorted(os.listdir(pool_folder)) == sorted(os.listdir(serial_folder))
+    for filename in os.listdir(serial_folder):
+        np.testing.assert_array_equal(cv2.imread(os.path.join(pool_folder, filename)),
+                                      cv2.imread(os.path.join(serial_folder, filename)))
+
+
+def test_strip_analysis_matches_whole_image(tmp_path):
+    image = np.random.default_rng(0).integers(0, 256, size=(120, 200, 3), dtype=np.uint8)
+    image_path = str(tmp_path / 'noise.png')
+    cv2.imwrite(image_path, image)
+
+    whole = analyze_image(image_path, HSV_LOWER, HSV_UPPER)
+    # Leaves room for 7-row strips once the dense histogram is reserved
+    strips = analyze_image(image_path, HSV_LOWER, HSV_UPPER,
+                           memory_budget=DENSE_HISTOGRAM_BYTES + 7 * 200 * ANALYSIS_BYTES_PER_PIXEL)
+
+    for whole_part, strip_part in zip(whole, strips):
+        np.testing.assert_array_equal(whole_part, strip_part)
+
+
+def _assert_same_outputs(folder, expected_folder):
+    assert sorted(os.listdir(folder)) == sorted(os.listdir(expected_folder))
+    for filename in os.listdir(expected_folder):
+        np.testing.assert_array_equal(cv2.imread(os.path.join(folder, filename)),
+                                      cv2.imread(os.path.join(expected_folder, filename)), err_msg=filename)
+
+
+def test_cached_run_after_an_image_change_matches_an_uncached_run(tmp_path):
+    input_folder = str(tmp_path / 'M')
+    shutil.copytree(SAMPLE_FOLDER, input_folder)
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    output_folder = str(tmp_path / 'cached')
+    extract_unique_colors(input_folder, HSV_LOWER, HSV_UPPER, output_folder, cache=cache)
+    cache.save()
+
+    # Change the first image in folder order: every later output counts its colors
+    first_image = list_images(input_folder)[0]
+    image = cv2.imread(first_image)
+    cv2.imwrite(first_image, np.ascontiguousarray(image[:, ::-1] // 2))
+
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    cached_colors = extract_unique_colors(input_folder, HSV_LOWER, HSV_UPPER, output_folder, cache=cache)
+    assert (cache.hits, cache.misses) == (len(list_images(input_folder)) - 1, 1)
+
+    uncached_folder = str(tmp_path / 'uncached')
+    uncached_colors = extract_unique_colors(input_folder, HSV_LOWER, HSV_UPPER, uncached_folder)
+    for cached_part, uncached_part in zip(cached_colors, uncached_colors):
+        np.testing.assert_array_equal(cached_part, uncached_part)
+    _assert_same_outputs(output_folder, uncached_folder)
+
+    # A new HSV range rewrites every output as well
+    cache.save()
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    extract_unique_colors(input_folder, [0, 0, 0], [90, 255, 255], output_folder, cache=cache)
+    extract_unique_colors(input_folder, [0, 0, 0], [90, 255, 255], uncached_folder)
+    _assert_same_outputs(output_folder, uncached_folder)
@@ -0,0 +1,33 @@
+import math
+
+import numpy as np
+
+from sampling import RatioEstimate
+
+
+def test_running_sums_match_the_direct_ratio_estimator():
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(100_000, 50_000_000, size=50)
+    desired_in_sample = rng.integers(0, 4096, size=50)
+    estimate = RatioEstimate(population=400, confidence=0.95)
+    for pixel_count, desired in zip(pixels, desired_in_sample):
+        estimate.add(int(pixel_count), 4096, int(desired))
+
+    x = pixels.astype(np.float64)
+    y = x * desired_in_sample / 4096
+    share = y.sum() / x.sum()
+    variance = (1 - 50 / 400) * (y - share * x).var(ddof=1) / (50 * x.mean() ** 2)
+
+    assert math.isclose(estimate.share(), share, rel_tol=1e-12)
+    assert math.isclose(estimate.half_width(), estimate.z * math.sqrt(variance), rel_tol=1e-9)
+
+
+def test_interval_needs_two_images_and_falls_back_to_binomial_error():
+    estimate = RatioEstimate(population=2)
+    estimate.add(1000, 100, 25)
+    assert estimate.half_width() == math.inf
+
+    estimate.add(1000, 100, 25)
+    expected = estimate.z * math.sqrt(0.25 * 0.75 / 200)
+    assert math.isclose(estimate.half_width(), expected)
+    assert estimate.interval() == (0.25 - expected, 0.25 + expected)
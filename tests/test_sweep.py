@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from color_engine import HSV_CUBE_SHAPE, SummedVolume, new_occupancy
+from sweep import parse_args, parse_bounds, sweep_ranges
+
+
+def test_default_bounds_reach_the_channel_maximum():
+    args = parse_args(['--target-accuracy', '80'])
+    assert (args.h[-1], args.s[-1], args.v[-1]) == (179, 255, 255)
+    assert parse_bounds('0:179:15', 180).tolist() == list(range(0, 180, 15)) + [179]
+
+
+def test_target_accuracy_is_required():
+    with pytest.raises(SystemExit):
+        parse_args([])
+
+
+def test_sweep_ranks_by_distance_to_the_target():
+    occupancy = new_occupancy()
+    cube = occupancy.reshape(HSV_CUBE_SHAPE)
+    cube[30, 200:256, 200:256] = True
+    cube[100, 0:10, 0:10] = True
+    summed_volume = SummedVolume(occupancy)
+    h_values, sv_values = parse_bounds('0:179:30', 180), parse_bounds('0:255:50', 256)
+
+    (lower, upper, desired, accuracy), _ = sweep_ranges(summed_volume, h_values, sv_values, sv_values, 90, top=5)
+
+    distance = np.abs(accuracy - 90)
+    assert np.all(np.diff(distance) >= 0)
+    # A box around the hue 30 block alone beats the full box, which is what ranking by accuracy would pick
+    assert distance[0] < 10
+    assert desired[0] < summed_volume.total
@@ -0,0 +1,160 @@
+import configparser
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import Test_aimbot_Video
+from benchmark import synthetic_video
+from color_engine import FINAL_CLASS, compile_color_table, mask_table, new_occupancy
+from color_store import COLOR_SET_EXTENSION, write_color_set
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HSV_LOWER = np.array([20, 100, 100])
+HSV_UPPER = np.array([40, 255, 255])
+UNDESIRED_COLORS = [(30, s, v) for s in range(200, 256, 8) for v in range(180, 256, 8)]
+
+
+@pytest.fixture(scope='module')
+def video_config(tmp_path_factory):
+    folder = tmp_path_factory.mktemp('video')
+    video_path = folder / 'input.mp4'
+    synthetic_video(str(video_path), 6, (160, 120))
+    # Undesired colors around the target's hue, so the final mask differs from the desired one
+    undesired_path = folder / 'undesired.hsvset'
+    write_color_set(str(undesired_path), np.array([h << 16 | s << 8 | v for h, s, v in UNDESIRED_COLORS],
+                                                  dtype=np.uint32))
+    config_path = folder / 'Config_Video.ini'
+    config_path.write_text(f"[Paths]\nvideo_path = {video_path}\nundesired_colors_file_path = {undesired_path}\n"
+                           "[HSV_Values]\nHSV_Custom_Lower = 20,100,100\nHSV_Custom_Upper = 40,255,255\n",
+                           encoding='utf-8')
+    return config_path
+
+
+def read_frames(video_config):
+    video_path = Test_aimbot_Video.load_settings(str(video_config))[0]
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def reference_frame(frame, frame_size):
+    # The per-frame path FrameProcessor replaces: fresh arrays every frame and one cv2.inRange per undesired color
+    frame_resized = cv2.resize(frame, frame_size)
+    hsv_frame = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2HSV)
+    desired_color_mask = cv2.inRange(hsv_frame, HSV_LOWER, HSV_UPPER)
+    undesired_mask_total = np.zeros_like(desired_color_mask)
+    for color in UNDESIRED_COLORS:
+        lower_bound = np.array([max(0, color[0] - 5), max(0, color[1] - 5), max(0, color[2] - 5)])
+        upper_bound = np.array([min(179, color[0] + 5), min(255, color[1] + 5), min(255, color[2] + 5)])
+        undesired_mask_total = cv2.bitwise_or(undesired_mask_total, cv2.inRange(hsv_frame, lower_bound, upper_bound))
+    final_mask = cv2.bitwise_and(desired_color_mask, cv2.bitwise_not(undesired_mask_total))
+    masked_output = cv2.bitwise_and(frame_resized, frame_resized, mask=final_mask)
+
+    total_pixels = frame_resized.size // 3
+    accuracy_percentage = (cv2.countNonZero(final_mask) / total_pixels) * 100
+    tracking_efficiency = (cv2.countNonZero(desired_color_mask) / total_pixels) * 100
+
+    mask_height, mask_width = final_mask.shape[:2]
+    combined_image = np.zeros((mask_height * 2, mask_width * 2, 3), dtype=np.uint8)
+    combined_image[0:mask_height, 0:mask_width] = frame_resized
+    combined_image[0:mask_height, mask_width:] = masked_output
+    font_scale = 0.5 * (mask_width * 2 / 900.0)
+    cv2.putText(combined_image, f'Accuracy: {accuracy_percentage:.2f}%', (10, mask_height + 20),
+                cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+    cv2.putText(combined_image, f'Tracking Efficiency: {tracking_efficiency:.2f}%', (mask_width + 10, mask_height + 20),
+                cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+    return (accuracy_percentage, tracking_efficiency), combined_image
+
+
+def read_stats(path):
+    return np.loadtxt(path, delimiter=',', skiprows=1)
+
+
+def test_single_mode_and_one_profile_give_the_same_stats(video_config, tmp_path):
+    single_path = tmp_path / 'single.csv'
+    profiles_path = tmp_path / 'profiles.csv'
+    config = str(video_config)
+    assert Test_aimbot_Video.main(['--config', config, '--stats-only', '--stats', str(single_path)]) == 0
+    assert Test_aimbot_Video.main(['--config', config, '--profiles', config, '--stats-only',
+                                   '--stats', str(profiles_path)]) == 0
+
+    single = read_stats(single_path)
+    profile = read_stats(tmp_path / 'profiles.Config_Video.csv')
+    np.testing.assert_array_equal(single, profile)
+    # The config's undesired colors were applied: accuracy falls below tracking
+    assert (single[:, 1] < single[:, 2]).any()
+
+
+def test_legacy_text_path_falls_back_to_the_hsvset_main_writes(video_config, tmp_path):
+    # main.py writes only required_undesired_colors.hsvset unless --text-colors is given
+    text = video_config.read_text(encoding='utf-8').replace('undesired.hsvset', 'undesired.txt')
+    legacy_config = tmp_path / 'legacy.ini'
+    legacy_config.write_text(text, encoding='utf-8')
+
+    final_table = Test_aimbot_Video.load_settings(str(video_config))[3]
+    legacy_final_table = Test_aimbot_Video.load_settings(str(legacy_config))[3]
+    np.testing.assert_array_equal(legacy_final_table, final_table)
+
+
+def test_shipped_video_config_names_the_hsvset_main_writes():
+    config = configparser.ConfigParser()
+    config.read(os.path.join(REPO_DIR, 'Config_Video.ini'))
+    path = config.get('Paths', 'undesired_colors_file_path')
+    assert path.endswith(os.path.join('Out_Put', 'required_undesired_colors' + COLOR_SET_EXTENSION))
+    assert Test_aimbot_Video.UNDESIRED_COLORS_FILE_PATH.endswith(COLOR_SET_EXTENSION)
+
+
+def test_frame_processor_matches_the_per_frame_path(video_config):
+    _, lower, upper, final_table = Test_aimbot_Video.load_settings(str(video_config))
+    processor = Test_aimbot_Video.FrameProcessor(lower, upper, final_table)
+    # One canvas reused for every frame, as the frame loops do
+    canvas = processor.new_canvas()
+    frames = read_frames(video_config)
+    assert len(frames) == 6
+    for frame in frames:
+        expected_stats, expected_image = reference_frame(frame, processor.frame_size)
+        assert processor.process(frame, canvas) == expected_stats
+        np.testing.assert_array_equal(canvas, expected_image)
+
+
+@pytest.mark.parametrize('tile_size, refresh_every', [(40, 0), (7, 0), (40, 3)])
+def test_incremental_tiles_match_a_full_recompute(video_config, tile_size, refresh_every):
+    _, lower, upper, final_table = Test_aimbot_Video.load_settings(str(video_config))
+    processor = Test_aimbot_Video.FrameProcessor(lower, upper, final_table)
+    incremental = Test_aimbot_Video.IncrementalFrameProcessor(lower, upper, final_table, tile_size=tile_size,
+                                                              refresh_every=refresh_every)
+    canvas, incremental_canvas = processor.new_canvas(), incremental.new_canvas()
+    # Repeated frames leave every tile unchanged, the patched one changes a few and the scrolling ones most of them
+    frames = read_frames(video_config)
+    patched = frames[0].copy()
+    patched[30:50, 60:75] = (0, 220, 230)
+    for frame in [frames[0], frames[0], patched, *frames, frames[-1]]:
+        assert incremental.process(frame, incremental_canvas) == processor.process(frame, canvas)
+        np.testing.assert_array_equal(incremental_canvas, canvas)
+    assert incremental.tiles_recomputed < incremental.tiles_seen
+
+
+def test_multi_profile_processor_matches_one_processor_per_profile(video_config):
+    _, lower, upper, final_table = Test_aimbot_Video.load_settings(str(video_config))
+    wide_lower, wide_upper = np.array([0, 50, 50]), np.array([60, 255, 255])
+    wide_table = mask_table(compile_color_table(wide_lower, wide_upper, new_occupancy()), FINAL_CLASS)
+    profiles = [('narrow', lower, upper, final_table), ('wide', wide_lower, wide_upper, wide_table)]
+
+    multi = Test_aimbot_Video.MultiProfileProcessor(profiles)
+    processors = [Test_aimbot_Video.FrameProcessor(*profile[1:]) for profile in profiles]
+    multi_canvases = multi.new_canvas()
+    canvases = [processor.new_canvas() for processor in processors]
+    for frame in read_frames(video_config):
+        multi_stats = multi.process(frame, multi_canvases)
+        assert multi_stats == [processor.process(frame, canvas) for processor, canvas in zip(processors, canvases)]
+        assert multi_stats[0] != multi_stats[1]
+        for multi_canvas, canvas in zip(multi_canvases, canvases):
+            np.testing.assert_array_equal(multi_canvas, canvas)
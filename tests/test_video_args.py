@@ -0,0 +1,41 @@
+import pytest
+
+from Test_aimbot_Video import parse_args
+
+
+@pytest.mark.parametrize('argv', [
+    ['--stride', '2'],
+    ['--start', '1.5'],
+    ['--end', '10'],
+    ['--headless', '--stride', '3'],
+    ['--segments', '2', '--profile', 'out/p'],
+    ['--stats-only'],
+    ['--stats-only', '--stats', 'stats.csv', '--segments', '2'],
+    ['--stats-only', '--stats', 'stats.csv', '--headless'],
+    ['--queue-size', '4'],
+    ['--headless', '--queue-size', '0'],
+    ['--segments', '2', '--headless', '--queue-size', '4'],
+    ['--profiles', 'a.ini', '--stats-only', '--stats', 'stats.csv', '--queue-size', '4'],
+    ['--tile-size', '20'],
+    ['--tile-threshold', '3'],
+    ['--refresh-every', '10'],
+    ['--verify-bgr-table'],
+])
+def test_ignored_option_combinations_are_rejected(argv):
+    with pytest.raises(SystemExit):
+        parse_args(argv)
+
+
+def test_stats_only_accepts_the_frame_window():
+    args = parse_args(['--stats-only', '--stats', 'stats.csv', '--stride', '5', '--start', '1', '--end', '2'])
+    assert (args.stride, args.start, args.end) == (5, 1.0, 2.0)
+
+
+@pytest.mark.parametrize('argv', [
+    ['--headless', '--queue-size', '4'],
+    ['--profiles', 'a.ini', 'b.ini', '--queue-size', '4'],
+    ['--incremental', '--tile-size', '20', '--tile-threshold', '3', '--refresh-every', '10'],
+    ['--bgr-table', '--verify-bgr-table'],
+])
+def test_options_are_accepted_with_the_mode_they_apply_to(argv):
+    parse_args(argv)